@@ -0,0 +1,101 @@
+"""Match rate and runtime of the race matcher on a saved ``all_keys.json`` snapshot.
+
+Compares the old exact-key intersection with RaceMatcher, then times RaceMatcher
+on the snapshot copied ``--scale`` times over (each copy with its venue names
+letter-shifted, so copies are distinct venues) to show how runtime grows with
+the number of races.
+
+Usage:
+    python -m benchmarks.match_benchmark [--snapshot all_keys.json] [--scale 1 2 4 8]
+"""
+import argparse
+import json
+import os
+import time
+
+from utils.race_matcher import RaceMatcher, VenueAliases, normalize_venue
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def exact_key(race):
+    """The key the old matcher intersected on."""
+    return f"{race.get('race_type')}_{normalize_venue(race['race_name'])}_{race['race_number']}"
+
+
+def exact_match(race_lists):
+    keys = [{exact_key(race) for race in races} for races in race_lists.values()]
+    return len(set.intersection(*keys))
+
+
+def fuzzy_match(race_lists):
+    matcher = RaceMatcher(race_lists, aliases=VenueAliases(persist=False))
+    matched = 0
+    for source, races in race_lists.items():
+        for race in races:
+            if matcher.add(source, race):
+                matched += 1
+    return matched
+
+
+def rename(venue, shift):
+    """Caesar-shift a venue's letters, so each copy's venues look nothing alike."""
+    shifted = []
+    for c in venue:
+        if c.isascii() and c.isalpha():
+            base = ord("a") if c.islower() else ord("A")
+            c = chr((ord(c) - base + shift) % 26 + base)
+        shifted.append(c)
+    return "".join(shifted)
+
+
+def scaled(race_lists, copies):
+    """The snapshot repeated ``copies`` times (up to 26), each copy's venues renamed apart."""
+    out = {}
+    for source, races in race_lists.items():
+        out[source] = [
+            dict(race, race_name=rename(race["race_name"], i), url=f"{race.get('url')}#{i}")
+            for i in range(copies) for race in races
+        ]
+    return out
+
+
+def timed(fn, race_lists, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(race_lists)
+        best = min(best, time.perf_counter() - start)
+    return result, best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--snapshot", default=os.path.join(ROOT_DIR, "all_keys.json"))
+    parser.add_argument("--scale", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with open(args.snapshot, "r", encoding="utf-8") as f:
+        race_maps = json.load(f)["race_maps"]
+    race_lists = {source: list(races.values()) for source, races in race_maps.items()}
+    anchor = next(iter(race_lists))
+    counts = ", ".join(f"{source}: {len(races)}" for source, races in race_lists.items())
+    print(f"Snapshot {args.snapshot} ({counts})\n")
+
+    print(f"{'matcher':<10}{'matched':>10}{'rate':>10}{'ms':>10}")
+    for name, fn in (("exact", exact_match), ("fuzzy", fuzzy_match)):
+        matched, ms = timed(fn, race_lists, args.repeat)
+        rate = matched / len(race_lists[anchor]) if race_lists[anchor] else 0
+        print(f"{name:<10}{matched:>10}{rate:>10.1%}{ms:>10.2f}")
+
+    print(f"\n{'scale':<10}{'races':>10}{'matched':>10}{'ms':>10}{'us/race':>10}")
+    for copies in args.scale:
+        lists = scaled(race_lists, copies)
+        total = sum(len(races) for races in lists.values())
+        matched, ms = timed(fuzzy_match, lists, args.repeat)
+        print(f"{copies:<10}{total:>10}{matched:>10}{ms:>10.2f}{ms * 1000 / total:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Per-page parse time for each HTML parser backend on saved fixture pages.
+
+Fixture pages are raw ``page.content()`` dumps saved as:
+    benchmarks/fixtures/sportsbet/*.html
+    benchmarks/fixtures/betfair/*.html
+
+Sites without saved fixtures are measured on ``--synthetic`` generated pages
+instead, built the same way as benchmarks.suite's fixture data.
+
+Usage:
+    python -m benchmarks.parse_benchmark [--fixtures DIR] [--repeat N] [--synthetic N]
+"""
+import argparse
+import glob
+import os
+import random
+import time
+
+from scrapers.html_parser import PARSER_BACKENDS, get_parser
+from scrapers.betfair.ladder import parse_ladder
+from scrapers.sportsbet.extract import parse_outcome_rows
+from benchmarks.suite import SEED, betfair_page, sportsbet_page
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+SITE_PARSERS = {
+    "sportsbet": parse_outcome_rows,
+    "betfair": parse_ladder,
+}
+SYNTHETIC_PAGES = {
+    "sportsbet": sportsbet_page,
+    "betfair": betfair_page,
+}
+
+
+class _FullParse:
+    """Wraps a backend so every parse builds the whole document (no partial spec)."""
+
+    def __init__(self, parser):
+        self._parser = parser
+
+    def parse(self, html, only=None):
+        return self._parser.parse(html)
+
+
+def load_pages(fixtures_dir, site):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(fixtures_dir, site, "*.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            pages.append((os.path.basename(path), f.read()))
+    return pages
+
+
+def synthetic_pages(site, count, seed=SEED):
+    rng = random.Random(seed)
+    return [(f"synthetic-{race}.html", SYNTHETIC_PAGES[site](race, rng)) for race in range(count)]
+
+
+def time_parse(parse_fn, parser, html, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parse_fn(html, parser)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--fixtures", default=FIXTURES_DIR)
+    arg_parser.add_argument("--repeat", type=int, default=20)
+    arg_parser.add_argument("--synthetic", type=int, default=5,
+                            help="generated pages per site without saved fixtures")
+    args = arg_parser.parse_args()
+
+    backends = {}
+    for name in PARSER_BACKENDS:
+        try:
+            backends[name] = get_parser(name)
+        except ImportError as e:
+            print(f"Skipping {name}: {e}")
+
+    for site, parse_fn in SITE_PARSERS.items():
+        pages = load_pages(args.fixtures, site)
+        if not pages:
+            print(f"No {site} fixtures in {os.path.join(args.fixtures, site)}, using {args.synthetic} synthetic pages")
+            pages = synthetic_pages(site, args.synthetic)
+
+        print(f"\n{site} ({len(pages)} pages, ms/page, mean of {args.repeat})")
+        print(f"{'page':<40}" + "".join(f"{name + ' full':>18}{name + ' partial':>20}" for name in backends))
+        for page_name, html in pages:
+            row = f"{page_name[:39]:<40}"
+            for parser in backends.values():
+                full = time_parse(parse_fn, _FullParse(parser), html, args.repeat)
+                partial = time_parse(parse_fn, parser, html, args.repeat)
+                row += f"{full:>18.2f}{partial:>20.2f}"
+            print(row)
+
+
+if __name__ == "__main__":
+    main()
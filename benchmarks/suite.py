@@ -0,0 +1,345 @@
+"""Offline benchmark suite for the scraping, matching and analytics hot paths.
+
+Every case runs on generated fixture data for a card of 5, 50 and 500 races
+(``--sizes``) with no browser or network:
+
+    betfair_ladder       parse_ladder on exchange page HTML, one page per race
+    betfair_market_book  parse_market_book on market-book JSON, one payload per race
+    sportsbet_cards      parse_outcome_rows + runner_entry on race page HTML
+    match_race_keys      make_race_key intersection over the all_keys.json snapshot
+    race_matcher         RaceMatcher over the same snapshot
+    dashboard_math       race_summary (the dashboard's book totals and EV) per race
+    pricing_engine       PricingEngine.compute over the whole card after a price move
+    stake_allocator      StakeAllocator.allocate over the whole card after a price move
+    liquidity_engine     LiquidityEngine.execute (three-level ladder fills) after a price move
+    coordinator_merge    one merge tick: OddsStore.apply + PriceHistory.record_many
+
+Each case reports throughput in races per second and p50/p99 latency of one
+operation (one race, or one whole card for matching and merging). Save a run with
+``--json`` and pass it to ``--compare`` on a later commit to see the change.
+
+Usage:
+    python -m benchmarks.suite [--sizes 5 50 500] [--rounds 20] [--only betfair_ladder ...]
+                               [--json results.json] [--compare baseline.json]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import time
+
+from data.odds_events import diff_odds
+from data.odds_store import OddsStore
+from data.price_history import PriceHistory
+from data.pricing import PricingEngine, race_summary
+from data.staking import StakeAllocator
+from data.liquidity import LiquidityEngine
+from data.runner_odds import RunnerOdds
+from data.runners import RunnerIdentity
+from scrapers.html_parser import DEFAULT_PARSER, get_parser
+from scrapers.betfair.ladder import parse_ladder
+from scrapers.betfair.market_book import parse_market_book
+from scrapers.sportsbet.extract import parse_outcome_rows, runner_entry
+from utils.match_races import make_race_key
+from utils.race_matcher import RaceMatcher, VenueAliases
+from benchmarks.match_benchmark import rename
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNNERS_PER_RACE = 12
+SEED = 1234
+
+
+# --- fixture data -----------------------------------------------------------
+
+def runner_names(race, count=RUNNERS_PER_RACE):
+    return [f"Runner {race}-{i}'s Pride" for i in range(1, count + 1)]
+
+
+def random_price(rng):
+    return round(rng.uniform(1.5, 40), 2)
+
+
+def betfair_page(race, rng):
+    """Exchange page HTML with the ladder markup parse_ladder reads."""
+    rows = []
+    for number, name in enumerate(runner_names(race), start=1):
+        cells = []
+        for _ in range(6):
+            cells.append(f'<label class="Zs3u5 AUP11 Qe-26">{random_price(rng)}</label>')
+            cells.append(f'<label class="He6+y Qe-26">${rng.randint(5, 5000)}</label>')
+        rows.append(f'<tr><td><h3 class="runner-name">{number}. {name}</h3></td><td>{"".join(cells)}</td></tr>')
+    filler = "<div class='promo'><p>Bet responsibly</p><img src='x.png'></div>" * 200
+    return (f"<html><head><title>12:30 Race {race} R1 1200m</title></head>"
+            f"<body>{filler}<table>{''.join(rows)}</table>{filler}</body></html>")
+
+
+def market_book(race, rng):
+    """(payload, market_id) shaped like the exchange's market-book response."""
+    market_id = f"1.{200000000 + race}"
+    runners = []
+    for number, name in enumerate(runner_names(race), start=1):
+        ladder = {side: [{"price": random_price(rng), "size": rng.randint(5, 5000)} for _ in range(3)]
+                  for side in ("availableToBack", "availableToLay")}
+        runners.append({
+            "selectionId": race * 100 + number,
+            "description": {"runnerName": name, "metadata": {"CLOTH_NUMBER": str(number)}},
+            "state": {"status": "ACTIVE", "sortPriority": number},
+            "exchange": ladder,
+        })
+    payload = {"eventTypes": [{"eventNodes": [{"marketNodes": [
+        {"marketId": market_id, "state": {"status": "OPEN"}, "runners": runners}
+    ]}]}]}
+    return payload, market_id
+
+
+def sportsbet_page(race, rng):
+    """Race page HTML with the outcome-card markup parse_outcome_rows reads."""
+    cards = []
+    for number, name in enumerate(runner_names(race), start=1):
+        flucs = "".join(f'<span class="priceFlucsTextDesktop_fiml4cj">{random_price(rng)}</span>' for _ in range(3))
+        cards.append(
+            f'<div class="outcomeCard_f7jc198"><div class="outcomeName_f18x6kvm">{number}. {name} ({number})</div>'
+            f'{flucs}<div class="priceText_f71sibe">{random_price(rng)}</div></div>'
+        )
+    filler = "<div class='nav'><a href='#'>Racing</a><span>Menu</span></div>" * 200
+    return f"<html><body>{filler}{''.join(cards)}{filler}</body></html>"
+
+
+def merged_race(race, rng):
+    """One race's merged odds as the store holds them ({runner_id: {source: entry}})."""
+    return {
+        runner_id: {
+            "sportsbet": RunnerOdds(name, runner_id + 1, {"1st_back": random_price(rng)}),
+            "betfair": RunnerOdds(name, runner_id + 1, {"1st_back": random_price(rng), "1st_lay": random_price(rng),
+                                                        "1st_back_dom": f"${rng.randint(5, 5000)}"}),
+        }
+        for runner_id, name in enumerate(runner_names(race))
+    }
+
+
+def snapshot_races(count):
+    """``count`` races per bookmaker from all_keys.json, repeated with renamed venues as needed."""
+    with open(os.path.join(ROOT_DIR, "all_keys.json"), "r", encoding="utf-8") as f:
+        race_maps = json.load(f)["race_maps"]
+    out = {}
+    for source, races in race_maps.items():
+        races = list(races.values())
+        out[source] = [
+            dict(race, race_name=rename(race["race_name"], i // len(races)), url=f"{race.get('url')}#{i}")
+            for i, race in ((i, races[i % len(races)]) for i in range(count))
+        ]
+    return out
+
+
+# --- cases ------------------------------------------------------------------
+# Each case takes the card size and returns (ops, races_per_op): zero-argument
+# callables, each timed on its own.
+
+def case_betfair_ladder(n, rng, parser):
+    pages = [betfair_page(race, rng) for race in range(n)]
+    return [lambda html=html: parse_ladder(html, parser) for html in pages], 1
+
+
+def case_betfair_market_book(n, rng, parser):
+    books = [market_book(race, rng) for race in range(n)]
+    return [lambda book=book: parse_market_book(book[0], book[1]) for book in books], 1
+
+
+def case_sportsbet_cards(n, rng, parser):
+    def parse(html):
+        return dict(runner_entry(*row) for row in parse_outcome_rows(html, parser))
+    pages = [sportsbet_page(race, rng) for race in range(n)]
+    return [lambda html=html: parse(html) for html in pages], 1
+
+
+def case_match_race_keys(n, rng, parser):
+    race_lists = snapshot_races(n)
+
+    def match():
+        keys = [{make_race_key(race) for race in races} for races in race_lists.values()]
+        return set.intersection(*keys)
+    return [match], n
+
+
+def case_race_matcher(n, rng, parser):
+    race_lists = snapshot_races(n)
+
+    def match():
+        matcher = RaceMatcher(race_lists, aliases=VenueAliases(persist=False))
+        return [matcher.add(source, race) for source, races in race_lists.items() for race in races]
+    return [match], n
+
+
+def case_dashboard_math(n, rng, parser):
+    races = [merged_race(race, rng) for race in range(n)]
+    return [lambda race=race: race_summary(race, "horse") for race in races], 1
+
+
+def case_pricing_engine(n, rng, parser):
+    engine = PricingEngine()
+    for race in range(n):
+        for runner, row in merged_race(race, rng).items():
+            for source, entry in row.items():
+                engine.record_many(diff_odds(f"race_{race}", source, {}, {runner: entry}))
+    moves = [diff_odds("race_0", "sportsbet", {}, {0: {"1st_back": random_price(rng)}}) for _ in range(20)]
+
+    def price(move):
+        engine.record_many(move)
+        return engine.compute()
+    return [lambda move=move: price(move) for move in moves], n
+
+
+def case_stake_allocator(n, rng, parser):
+    engine = PricingEngine()
+    for race in range(n):
+        for runner, row in merged_race(race, rng).items():
+            for source, entry in row.items():
+                engine.record_many(diff_odds(f"race_{race}", source, {}, {runner: entry}))
+    allocator = StakeAllocator(engine)
+    moves = [diff_odds("race_0", "sportsbet", {}, {0: {"1st_back": random_price(rng)}}) for _ in range(20)]
+
+    def allocate(move):
+        engine.record_many(move)
+        return allocator.allocate()
+    return [lambda move=move: allocate(move) for move in moves], n
+
+
+def case_liquidity_engine(n, rng, parser):
+    engine = PricingEngine()
+    for race in range(n):
+        for runner, row in merged_race(race, rng).items():
+            # Fill in the rest of the exchange ladder
+            for level in ("2nd", "3rd"):
+                for side in ("back", "lay"):
+                    row["betfair"][f"{level}_{side}"] = random_price(rng)
+                    row["betfair"][f"{level}_{side}_dom"] = f"${rng.randint(5, 5000)}"
+            row["betfair"]["1st_lay_dom"] = f"${rng.randint(5, 5000)}"
+            for source, entry in row.items():
+                engine.record_many(diff_odds(f"race_{race}", source, {}, {runner: entry}))
+    liquidity = LiquidityEngine(engine, StakeAllocator(engine))
+    moves = [diff_odds("race_0", "sportsbet", {}, {0: {"1st_back": random_price(rng)}}) for _ in range(20)]
+
+    def execute(move):
+        engine.record_many(move)
+        return liquidity.execute()
+    return [lambda move=move: execute(move) for move in moves], n
+
+
+def case_coordinator_merge(n, rng, parser, ticks=40):
+    """Every runner's prices move each tick, as the scrapers would publish them."""
+    store, history = OddsStore(), PriceHistory()
+    identities = [RunnerIdentity() for _ in range(n)]
+    previous = [{} for _ in range(n)]
+    batches = []
+    for tick in range(ticks):
+        batch = []
+        for race in range(n):
+            book, market_id = market_book(race, rng)
+            _, horse_data = parse_market_book(book, market_id)
+            horse_data = identities[race].assign("betfair", horse_data)
+            batch.extend(diff_odds(f"race_{race}", "betfair", previous[race], horse_data, timestamp=tick))
+            previous[race] = horse_data
+        batches.append(batch)
+
+    def merge(batch):
+        store.apply(batch)
+        history.record_many(batch)
+    return [lambda batch=batch: merge(batch) for batch in batches], n
+
+
+CASES = {
+    "betfair_ladder": case_betfair_ladder,
+    "betfair_market_book": case_betfair_market_book,
+    "sportsbet_cards": case_sportsbet_cards,
+    "match_race_keys": case_match_race_keys,
+    "race_matcher": case_race_matcher,
+    "dashboard_math": case_dashboard_math,
+    "pricing_engine": case_pricing_engine,
+    "stake_allocator": case_stake_allocator,
+    "liquidity_engine": case_liquidity_engine,
+    "coordinator_merge": case_coordinator_merge,
+}
+
+
+# --- running and reporting --------------------------------------------------
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, max(0, round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_case(case, n, rounds, parser):
+    ops, races_per_op = case(n, random.Random(SEED), parser)
+    # One untimed pass warms caches (partial-parse specs, matcher indexes, etc.)
+    for op in ops:
+        op()
+
+    # Every round runs each op once
+    latencies = []
+    for _ in range(rounds):
+        for op in ops:
+            start = time.perf_counter()
+            op()
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    total = sum(latencies)
+    return {
+        "races": n,
+        "ops": len(latencies),
+        "races_per_s": len(latencies) * races_per_op / total if total else float("inf"),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("--sizes", type=int, nargs="+", default=[5, 50, 500])
+    arg_parser.add_argument("--rounds", type=int, default=20)
+    arg_parser.add_argument("--only", nargs="+", choices=list(CASES), default=list(CASES))
+    arg_parser.add_argument("--parser", default=DEFAULT_PARSER)
+    arg_parser.add_argument("--json", help="write the results to this file")
+    arg_parser.add_argument("--compare", help="results file from an earlier run to compare against")
+    args = arg_parser.parse_args()
+
+    parser = get_parser(args.parser)
+    baseline = {}
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = {(r["case"], r["races"]): r for r in json.load(f)["results"]}
+
+    header = f"{'case':<22}{'races':>7}{'ops':>7}{'races/s':>12}{'p50 ms':>10}{'p99 ms':>10}"
+    print(header + (f"{'p50 vs base':>13}" if baseline else ""))
+    results = []
+    for name in args.only:
+        for n in args.sizes:
+            result = {"case": name, **run_case(CASES[name], n, args.rounds, parser)}
+            results.append(result)
+            line = (f"{name:<22}{n:>7}{result['ops']:>7}{result['races_per_s']:>12.0f}"
+                    f"{result['p50_ms']:>10.3f}{result['p99_ms']:>10.3f}")
+            base = baseline.get((name, n))
+            if base and base["p50_ms"]:
+                line += f"{result['p50_ms'] / base['p50_ms']:>12.2f}x"
+            print(line)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"revision": git_revision(), "parser": args.parser, "rounds": args.rounds,
+                       "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
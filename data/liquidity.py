@@ -0,0 +1,141 @@
+from collections import namedtuple
+import numpy as np
+from data.pricing import LADDER_LEVELS, PRICE_COLUMNS, SB_BACK, BF_BACK, BF_LAY, pricing_engine
+from data.staking import (BF_BACK_STAKE, BF_LAY_STAKE, MIN_STAKES, SB_STAKE, STAKE_STEPS, round_down,
+                          stake_allocator)
+
+# Columns of the pricing engine's array holding each ladder side, best level first
+LADDER_COLUMNS = {
+    side: ([PRICE_COLUMNS[("betfair", f"{level}_{side}")] for level in LADDER_LEVELS],
+           [PRICE_COLUMNS[("betfair", f"{level}_{side}_dom")] for level in LADDER_LEVELS])
+    for side in ("back", "lay")
+}
+
+# How much of a race's stake plan the exchange's ladder can take right now.
+# ``fill_ratio`` is the share of the plan that fills without any Betfair leg going
+# past its break-even price; ``outlay`` and ``profit`` are for that share, at the
+# volume-weighted prices it would fill at, rounded to each bookmaker's increments.
+Execution = namedtuple("Execution", ["fill_ratio", "outlay", "profit"])
+
+
+def ladder(prices, side):
+    """(prices, sizes) of one ladder side as (races x runners x levels), best level first.
+
+    Missing levels have a NaN price and a size of 0.
+    """
+    price_columns, size_columns = LADDER_COLUMNS[side]
+    return prices[..., price_columns], np.nan_to_num(prices[..., size_columns])
+
+
+def fill(level_prices, level_sizes, side, target, stake=np.inf):
+    """Walk the ladder filling up to ``stake`` at ``target`` or better.
+
+    ``side`` is the ladder side being taken: "back" fills at prices >= target and
+    "lay" at prices <= target. ``target`` and ``stake`` broadcast against the
+    (races x runners) shape. Returns the stake filled and its volume-weighted
+    average price (NaN where nothing fills).
+    """
+    target = np.asarray(target)[..., None]
+    with np.errstate(invalid="ignore"):
+        usable = level_prices >= target if side == "back" else level_prices <= target
+    sizes = np.where(usable, level_sizes, 0)
+    before = np.cumsum(sizes, axis=-1) - sizes
+    taken = np.clip(np.asarray(stake)[..., None] - before, 0, sizes)
+    filled = taken.sum(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vwap = np.where(filled > 0, np.where(taken > 0, taken * level_prices, 0).sum(axis=-1) / filled, np.nan)
+    return filled, vwap
+
+
+def _outcome_profits(stakes, back, back_vwap, lay_vwap, commission):
+    """Profit if each runner wins, for (races x runners x STAKE_COLUMNS) stakes.
+
+    Betfair commission comes off each winning bet, as the pricing engine takes it.
+    """
+    c = commission[:, None]
+    sb, bf_back, bf_lay = stakes[..., SB_STAKE], stakes[..., BF_BACK_STAKE], stakes[..., BF_LAY_STAKE]
+    back_stakes = sb + bf_back
+    won = (np.where(sb > 0, sb * (back - 1), 0)
+           + np.where(bf_back > 0, bf_back * (back_vwap - 1) * (1 - c), 0)
+           - np.where(bf_lay > 0, bf_lay * (lay_vwap - 1), 0))
+    lay_kept = bf_lay * (1 - c)
+    # A runner's own back stakes come back with its winnings; every other runner's lays pay out
+    return won + back_stakes - back_stakes.sum(axis=1)[:, None] + lay_kept.sum(axis=1)[:, None] - lay_kept
+
+
+class LiquidityEngine:
+    """Sizes every race's stake plan against the exchange's three-level ladder in one pass.
+
+    The stake allocator prices each plan at the top of the Betfair book. Here each
+    Betfair leg instead walks all three ladder levels, down to the worst price at
+    which the plan as a whole still breaks even, and the plan is scaled to the
+    smallest leg's fill. Results are cached until prices or the bankroll change.
+    """
+
+    def __init__(self, engine=pricing_engine, allocator=stake_allocator):
+        self.engine = engine
+        self.allocator = allocator
+        self._key = None
+        self._executions = {}
+
+    def depth(self, side, target):
+        """(stake, VWAP) fillable at ``target`` or better, per race row and runner id."""
+        level_prices, level_sizes = ladder(self.engine.prices, side)
+        return fill(level_prices, level_sizes, side, target)
+
+    def execute(self):
+        """Return {race_key: Execution} for every race with an executable stake plan."""
+        self.allocator.allocate()
+        key = (self.engine.version, self.allocator.bankroll)
+        if key == self._key:
+            return self._executions
+
+        prices, commission = self.engine.prices, self.engine.commission
+        stakes, outlay = self.allocator.stakes, self.allocator.outlay
+        c = commission[:, None]
+        back = prices[..., SB_BACK]
+        present = ~np.isnan(prices[..., [SB_BACK, BF_BACK, BF_LAY]]).all(axis=-1)
+        back_prices, back_sizes = ladder(prices, "back")
+        lay_prices, lay_sizes = ladder(prices, "lay")
+        sb, bf_back, bf_lay = stakes[..., SB_STAKE], stakes[..., BF_BACK_STAKE], stakes[..., BF_LAY_STAKE]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # Break-even prices: a back leg must still return the outlay if its runner
+            # wins, and a lay leg must not lose more than the matching back wins
+            back_floor = (outlay[:, None] / bf_back - 1) / (1 - c) + 1
+            lay_ceiling = sb * (back - 1) / bf_lay + 1
+            back_filled, _ = fill(back_prices, back_sizes, "back", back_floor, bf_back)
+            lay_filled, _ = fill(lay_prices, lay_sizes, "lay", lay_ceiling, bf_lay)
+            ratios = np.minimum(np.where(bf_back > 0, back_filled / bf_back, 1),
+                                np.where(bf_lay > 0, lay_filled / bf_lay, 1))
+        fill_ratio = np.where(np.isfinite(self.allocator.profit), ratios.min(axis=1, initial=1), 0)
+
+        # Scale the plan down to what fills, then reprice it at the prices it fills at
+        scaled = stakes * fill_ratio[:, None, None]
+        scaled[..., SB_STAKE] = round_down(scaled[..., SB_STAKE], STAKE_STEPS["sportsbet"])
+        scaled[..., [BF_BACK_STAKE, BF_LAY_STAKE]] = round_down(scaled[..., [BF_BACK_STAKE, BF_LAY_STAKE]],
+                                                                STAKE_STEPS["betfair"])
+        below_minimum = (((scaled[..., SB_STAKE] > 0) & (scaled[..., SB_STAKE] < MIN_STAKES["sportsbet"]))
+                         | ((scaled[..., BF_BACK_STAKE:] > 0) & (scaled[..., BF_BACK_STAKE:] < MIN_STAKES["betfair"])).any(axis=-1))
+        _, back_vwap = fill(back_prices, back_sizes, "back", back_floor, scaled[..., BF_BACK_STAKE])
+        _, lay_vwap = fill(lay_prices, lay_sizes, "lay", lay_ceiling, scaled[..., BF_LAY_STAKE])
+
+        executable = (fill_ratio > 0) & ~below_minimum.any(axis=1)
+        with np.errstate(invalid="ignore"):
+            profits = _outcome_profits(scaled, back, back_vwap, lay_vwap, commission)
+        profit = np.where(present, profits, np.inf).min(axis=1)
+        scaled_outlay = (scaled[..., SB_STAKE] + scaled[..., BF_BACK_STAKE]
+                         + np.where(scaled[..., BF_LAY_STAKE] > 0, scaled[..., BF_LAY_STAKE] * (lay_vwap - 1), 0)).sum(axis=1)
+
+        self._executions = {
+            race_key: Execution(float(fill_ratio[row]), float(scaled_outlay[row]), float(profit[row]))
+            for race_key, row in self.engine.rows.items() if executable[row]
+        }
+        self._key = key
+        return self._executions
+
+    def execution(self, race_key):
+        return self.execute().get(race_key)
+
+
+liquidity_engine = LiquidityEngine()
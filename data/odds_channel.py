@@ -0,0 +1,234 @@
+import math
+import time
+import numpy as np
+from multiprocessing import shared_memory
+from data.odds_events import OddsChange, race_removed
+from data.runner_odds import LADDER_FIELDS
+from utils.logger import setup_logger
+
+logger = setup_logger("OddsChannel")
+
+# Ladder fields sent through the shared-memory ring; everything else (names,
+# flucs, removals, matched races) goes over the pipe.
+PRICE_FIELDS = LADDER_FIELDS
+SOURCES = ("sportsbet", "betfair")
+_FIELD_INDEX = {field: i for i, field in enumerate(PRICE_FIELDS)}
+_SOURCE_INDEX = {source: i for i, source in enumerate(SOURCES)}
+
+RECORD_DTYPE = np.dtype([
+    ("seq", "<u8"), ("t", "<f8"), ("value", "<f8"),
+    ("race", "<i4"), ("runner", "<i4"), ("field", "<i2"), ("source", "<i1"),
+])
+# head (records written) and watermark (highest seq sent on either channel)
+HEADER_DTYPE = np.dtype("<u8")
+HEADER_SLOTS = 2
+DEFAULT_CAPACITY = 1 << 16
+
+
+def _ring_arrays(shm, capacity):
+    header = np.ndarray((HEADER_SLOTS,), dtype=HEADER_DTYPE, buffer=shm.buf)
+    records = np.ndarray((capacity,), dtype=RECORD_DTYPE, buffer=shm.buf, offset=HEADER_SLOTS * HEADER_DTYPE.itemsize)
+    return header, records
+
+
+def _ring_value(value):
+    """The float a price is sent as on the ring, or None if it has to go over the pipe."""
+    if value is None:
+        return math.nan
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return None
+
+
+def resync_changes(current, races, timestamp=None):
+    """The changes that turn a reader's ``current`` races into a resync snapshot's ``races``.
+
+    Races and runners missing from the snapshot are removed and every field of
+    the rest is resent, so sinks fed changes (price history, pricing engine)
+    end up matching the snapshot too.
+    """
+    timestamp = timestamp or time.time()
+    changes = [race_removed(race_key, timestamp) for race_key in current.keys() - races.keys()]
+    for race_key, race in races.items():
+        old_race = current.get(race_key, {})
+        for runner, old_row in old_race.items():
+            for source, entry in old_row.items():
+                if source not in race.get(runner, {}):
+                    changes.append(OddsChange(race_key, source, runner, None, entry, None, timestamp))
+        changes.extend(
+            OddsChange(race_key, source, runner, field, None, value, timestamp)
+            for runner, row in race.items()
+            for source, entry in row.items()
+            for field, value in entry.items()
+        )
+    return changes
+
+
+class OddsChannelWriter:
+    """The scraping process's end of the odds channel.
+
+    Numeric ladder changes are written as fixed-size records into a shared-memory
+    ring; other changes, matched races and race-key registrations are sent over
+    ``conn``. Every message on either side carries one global sequence number,
+    and the header's watermark is bumped after each send, so the reader can put
+    the two streams back in order.
+    """
+
+    def __init__(self, conn, shm_name, capacity=DEFAULT_CAPACITY):
+        self.conn = conn
+        self.capacity = capacity
+        self._shm = shared_memory.SharedMemory(name=shm_name)
+        self._header, self._records = _ring_arrays(self._shm, capacity)
+        self._seq = 0
+        self._race_ids = {}  # race_key -> ring race index
+
+    def _next_seq(self):
+        self._seq += 1
+        return self._seq
+
+    def _send(self, kind, payload):
+        seq = self._next_seq()
+        self.conn.send((kind, seq, payload))
+        self._header[1] = seq
+
+    def _race_id(self, race_key):
+        race_id = self._race_ids.get(race_key)
+        if race_id is None:
+            race_id = self._race_ids[race_key] = len(self._race_ids)
+            self._send("race", (race_id, race_key))
+        return race_id
+
+    def send_changes(self, changes):
+        for change in changes:
+            field = _FIELD_INDEX.get(change.field)
+            value = _ring_value(change.new) if field is not None and change.source in _SOURCE_INDEX else None
+            if value is None:
+                self._send("change", tuple(change))
+                continue
+
+            race_id = self._race_id(change.race_key)
+            seq = self._next_seq()
+            head = int(self._header[0])
+            self._records[head % self.capacity] = (seq, change.timestamp, value, race_id, change.runner,
+                                                   field, _SOURCE_INDEX[change.source])
+            self._header[0] = head + 1
+            self._header[1] = seq
+
+    def send_match(self, match):
+        self._send("match", match)
+
+    def send_snapshot(self, races):
+        """Send every race's current prices ({race_key: {runner: {source: entry}}})."""
+        self._send("snapshot", races)
+
+    def poll_requests(self):
+        """Return the reader's pending requests ("resync" or "stop")."""
+        requests = []
+        while self.conn.poll():
+            requests.append(self.conn.recv())
+        return requests
+
+    def close(self):
+        self._header = self._records = None
+        self._shm.close()
+
+
+class OddsChannelReader:
+    """The GUI process's end of the odds channel; owns the shared memory.
+
+    ``poll`` returns everything safely readable from both channels in send order.
+    If the reader falls more than ``capacity`` records behind, the lost prices
+    can't be recovered from the ring, so it asks the writer for a full snapshot.
+    """
+
+    def __init__(self, conn, capacity=DEFAULT_CAPACITY):
+        self.conn = conn
+        self.capacity = capacity
+        size = HEADER_SLOTS * HEADER_DTYPE.itemsize + capacity * RECORD_DTYPE.itemsize
+        self._shm = shared_memory.SharedMemory(create=True, size=size)
+        self._header, self._records = _ring_arrays(self._shm, capacity)
+        self._header[:] = 0
+        self._tail = 0
+        self._race_keys = {}  # ring race index -> race_key
+        self._held = []       # pipe messages sent after the last watermark we read
+        self._resyncing = False
+
+    @property
+    def shm_name(self):
+        return self._shm.name
+
+    def _resync(self, lost):
+        if not self._resyncing:
+            logger.warning(f"Odds ring overran by {lost} records, resyncing")
+            self.conn.send("resync")
+            self._resyncing = True
+
+    def _read_ring(self, head, watermark):
+        """Copy out the unread records with seq <= watermark."""
+        start = self._tail
+        if head - start > self.capacity:
+            self._resync(head - start - self.capacity)
+            start = head - self.capacity
+        records = self._records[np.arange(start, head) % self.capacity].copy()
+        # The writer may have lapped us while we copied; drop anything overwritten
+        lapped = int(self._header[0]) - self.capacity
+        if lapped > start:
+            self._resync(lapped - start)
+            records = records[lapped - start:]
+            start = lapped
+        keep = int(np.searchsorted(records["seq"], watermark, side="right"))
+        self._tail = start + keep
+        return records[:keep]
+
+    def _ring_change(self, record):
+        return OddsChange(self._race_keys[int(record["race"])], SOURCES[record["source"]], int(record["runner"]),
+                          PRICE_FIELDS[record["field"]], None, float(record["value"]), float(record["t"]))
+
+    def poll(self):
+        """Return [(kind, payload)] in send order, where kind is "change" (an
+        OddsChange), "match" (a matched race) or "snapshot" (every race's odds after
+        a resync, which replace the reader's copy outright)."""
+        # Read the watermark first: everything at or below it is already in the
+        # ring or the pipe
+        watermark = int(self._header[1])
+        head = int(self._header[0])
+
+        messages = self._held
+        while self.conn.poll():
+            messages.append(self.conn.recv())
+        self._held = [message for message in messages if message[1] > watermark]
+        ordered = [message for message in messages if message[1] <= watermark]
+        ordered.extend(("ring", int(record["seq"]), record) for record in self._read_ring(head, watermark))
+        ordered.sort(key=lambda message: message[1])
+
+        out = []
+        for kind, seq, payload in ordered:
+            if kind == "race":
+                race_id, race_key = payload
+                self._race_keys[race_id] = race_key
+            elif kind == "ring":
+                out.append(("change", self._ring_change(payload)))
+            elif kind == "change":
+                out.append(("change", OddsChange(*payload)))
+            elif kind == "snapshot":
+                self._resyncing = False
+                out.append(("snapshot", payload))
+            else:
+                out.append((kind, payload))
+        return out
+
+    def request_stop(self):
+        """Ask the writer's process to shut down cleanly."""
+        self.conn.send("stop")
+
+    def close(self):
+        self._header = self._records = None
+        self._shm.close()
+        self._shm.unlink()
@@ -0,0 +1,97 @@
+import asyncio
+import time
+from collections import namedtuple
+from data.runner_odds import RunnerOdds
+from utils.logger import setup_logger
+
+logger = setup_logger("OddsEvents")
+
+# One changed field of one runner, identified by its per-race runner id. ``field`` is None
+# when the whole runner disappeared (new is None) and ``runner`` is None when the whole
+# race was retired.
+OddsChange = namedtuple("OddsChange", ["race_key", "source", "runner", "field", "old", "new", "timestamp"])
+
+
+def _same(old, new):
+    # Missing prices are NaN, which never equals itself
+    return old == new or (old != old and new != new)
+
+
+def diff_odds(race_key, source, old, new, timestamp=None):
+    """Return the OddsChange events that turn one latest_odds dict into the next."""
+    if timestamp is None:
+        timestamp = time.time()
+
+    changes = []
+    for runner, entry in new.items():
+        previous = old.get(runner, {})
+        for field, value in entry.items():
+            old_value = previous.get(field)
+            if field not in previous or not _same(old_value, value):
+                changes.append(OddsChange(race_key, source, runner, field, old_value, value, timestamp))
+
+    for runner in old.keys() - new.keys():
+        changes.append(OddsChange(race_key, source, runner, None, old[runner], None, timestamp))
+
+    return changes
+
+
+def race_removed(race_key, timestamp=None):
+    """The event published when a race is retired."""
+    return OddsChange(race_key, None, None, None, None, None, timestamp or time.time())
+
+
+def apply_change(race_odds, change):
+    """Apply one OddsChange to merged odds shaped {race_key: {runner_id: {source: RunnerOdds}}}."""
+    if change.runner is None:
+        race_odds.pop(change.race_key, None)
+        return
+
+    if change.field is None:
+        # A removal never brings a race back
+        race = race_odds.get(change.race_key, {})
+        row = race.get(change.runner)
+        if row is not None:
+            row.pop(change.source, None)
+            # Drop the row once no source lists the runner any more
+            if not row:
+                del race[change.runner]
+        return
+
+    race = race_odds.setdefault(change.race_key, {})
+    row = race.setdefault(change.runner, {})
+    entry = row.get(change.source)
+    if entry is None:
+        entry = row[change.source] = RunnerOdds()
+    entry[change.field] = change.new
+
+
+class OddsEventBus:
+    """Fans published changes out to every subscriber's own queue.
+
+    A subscriber that falls behind loses its oldest events rather than blocking
+    the merge stage.
+    """
+
+    def __init__(self):
+        self._subscribers = []
+
+    def subscribe(self, maxsize=10000):
+        queue = asyncio.Queue(maxsize=maxsize)
+        self._subscribers.append(queue)
+        return queue
+
+    def unsubscribe(self, queue):
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+    def publish(self, changes):
+        for queue in self._subscribers:
+            dropped = 0
+            for change in changes:
+                if queue.full():
+                    queue.get_nowait()
+                    dropped += 1
+                queue.put_nowait(change)
+            if dropped:
+                logger.warning(f"Odds subscriber is falling behind, dropped {dropped} oldest changes")
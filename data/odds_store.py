@@ -1 +1,116 @@
-shared_odds = {}
\ No newline at end of file
+from data.odds_events import OddsEventBus, apply_change
+
+
+def make_odds_key(match):
+    """Key a matched race's merged odds by its Betfair location and race number.
+
+    Races Betfair doesn't number (UK races come through as -1) use the jump time instead.
+    """
+    race = match['betfair']
+    if str(race['race_number']) in ("-1", "0"):
+        return f"{race['location']}_{race['race_time']}"
+    return f"{race['location']}_R{race['race_number']}"
+
+
+class OddsSnapshot:
+    """An immutable view of every race's merged odds at one store version.
+
+    ``races`` is {race_key: {runner_id: {source: entry}}}. Nothing in a published
+    snapshot is ever mutated, so readers can hold on to it for a whole frame.
+    """
+    __slots__ = ("version", "races", "race_versions")
+
+    def __init__(self, version, races, race_versions):
+        self.version = version
+        self.races = races
+        self.race_versions = race_versions  # race_key -> store version of its last change
+
+
+class OddsStore:
+    """Versioned merged odds with copy-on-write snapshot swaps.
+
+    Writers build the next snapshot alongside the published one, copying only the
+    races a batch touches, then publish it with a single reference swap - readers
+    see either the old or the new snapshot, never a half-applied or empty one.
+    """
+
+    def __init__(self):
+        self._snapshot = OddsSnapshot(0, {}, {})
+        self._subscribers = []
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    def snapshot(self):
+        return self._snapshot
+
+    def apply(self, changes):
+        """Apply a batch of OddsChange events as one new version."""
+        if not changes:
+            return self._snapshot.version
+
+        current = self._snapshot
+        version = current.version + 1
+        races = dict(current.races)
+        race_versions = dict(current.race_versions)
+        copied = set()
+        touched = set()
+
+        for change in changes:
+            race_key = change.race_key
+            race_versions[race_key] = version
+            touched.add(race_key)
+            if change.runner is None:
+                races.pop(race_key, None)
+                copied.discard(race_key)
+                continue
+            if change.field is None and race_key not in races:
+                continue  # a runner removed from a race that's already gone
+            if race_key not in copied:
+                # Copy the race down to the per-source entries before mutating it
+                races[race_key] = {
+                    runner: {source: entry.copy() for source, entry in row.items()}
+                    for runner, row in races.get(race_key, {}).items()
+                }
+                copied.add(race_key)
+            apply_change(races, change)
+
+        self._snapshot = OddsSnapshot(version, races, race_versions)
+        for callback in list(self._subscribers):
+            callback(version, touched)
+        return version
+
+    def replace(self, races):
+        """Publish ``races`` ({race_key: {runner_id: {source: entry}}}) as the whole of the
+        next version, e.g. after a resync. ``races`` must not be mutated afterwards."""
+        current = self._snapshot
+        version = current.version + 1
+        touched = current.races.keys() | races.keys()
+        race_versions = dict(current.race_versions)
+        for race_key in touched:
+            race_versions[race_key] = version
+        self._snapshot = OddsSnapshot(version, dict(races), race_versions)
+        for callback in list(self._subscribers):
+            callback(version, touched)
+        return version
+
+    def changed_since(self, version):
+        """Return (current_version, race keys changed or removed after ``version``)."""
+        snapshot = self._snapshot
+        changed = [race_key for race_key, race_version in snapshot.race_versions.items() if race_version > version]
+        return snapshot.version, changed
+
+    def subscribe(self, callback):
+        """Call ``callback(version, changed_race_keys)`` after every new version."""
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+
+shared_odds = OddsStore()
+
+# Merged per-runner changes, for the UI and any alerting
+odds_events = OddsEventBus()
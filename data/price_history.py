@@ -0,0 +1,144 @@
+import numpy as np
+from data.runner_odds import to_float
+
+# (source, field) -> series name. Only these fields are kept as history.
+SERIES_FIELDS = {
+    ("betfair", "1st_back"): "bf_back",
+    ("betfair", "1st_lay"): "bf_lay",
+    ("betfair", "1st_back_dom"): "bf_volume",
+    ("sportsbet", "1st_back"): "sb_win",
+}
+SERIES = tuple(SERIES_FIELDS.values())
+
+
+class RingBuffer:
+    """A preallocated, fixed-capacity (timestamp, value) ring; the oldest points are overwritten."""
+    __slots__ = ("capacity", "ts", "values", "head", "count")
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.ts = np.empty(capacity, dtype=np.float64)
+        self.values = np.empty(capacity, dtype=np.float32)
+        self.head = 0   # next slot to write
+        self.count = 0
+
+    def append(self, timestamp, value):
+        self.ts[self.head] = timestamp
+        self.values[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def ordered(self):
+        """Return (ts, values) oldest first, as views where possible."""
+        if self.count < self.capacity:
+            return self.ts[:self.count], self.values[:self.count]
+        return (np.concatenate((self.ts[self.head:], self.ts[:self.head])),
+                np.concatenate((self.values[self.head:], self.values[:self.head])))
+
+    def window(self, start=None, end=None):
+        """Return (ts, values) between start and end (epoch seconds, inclusive)."""
+        ts, values = self.ordered()
+        lo = 0 if start is None else np.searchsorted(ts, start, side="left")
+        hi = len(ts) if end is None else np.searchsorted(ts, end, side="right")
+        return ts[lo:hi], values[lo:hi]
+
+
+def minmax_downsample(ts, values, max_points):
+    """Keep the min and max of each time bucket, so spikes survive downsampling."""
+    if len(ts) <= max_points:
+        return ts, values
+    buckets = max(max_points // 2, 1)
+    edges = np.linspace(ts[0], ts[-1], buckets + 1)
+    starts = np.searchsorted(ts, edges[:-1], side="left")
+    ends = np.append(starts[1:], len(ts))
+
+    keep = []
+    for start, end in zip(starts, ends):
+        if start >= end:
+            continue
+        bucket = values[start:end]
+        lo, hi = start + int(np.argmin(bucket)), start + int(np.argmax(bucket))
+        keep.extend((lo, hi) if lo <= hi else (hi, lo))
+    keep = np.unique(np.asarray(keep, dtype=np.intp))
+    return ts[keep], values[keep]
+
+
+def lttb_downsample(ts, values, max_points):
+    """Largest-Triangle-Three-Buckets: keeps the points that best preserve the line's shape."""
+    n = len(ts)
+    if n <= max_points or max_points < 3:
+        return ts, values
+
+    bucket_size = (n - 2) / (max_points - 2)
+    keep = np.empty(max_points, dtype=np.intp)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(max_points - 2):
+        start = int(i * bucket_size) + 1
+        end = int((i + 1) * bucket_size) + 1
+        next_end = min(int((i + 2) * bucket_size) + 1, n)
+        # Average of the next bucket is the third triangle vertex
+        avg_t = ts[end:next_end].mean() if next_end > end else ts[-1]
+        avg_v = values[end:next_end].mean() if next_end > end else values[-1]
+
+        bucket_t, bucket_v = ts[start:end], values[start:end]
+        areas = np.abs((ts[a] - avg_t) * (bucket_v - values[a]) - (ts[a] - bucket_t) * (avg_v - values[a]))
+        a = start + int(np.argmax(areas))
+        keep[i + 1] = a
+    return ts[keep], values[keep]
+
+
+DOWNSAMPLERS = {
+    "minmax": minmax_downsample,
+    "lttb": lttb_downsample,
+}
+
+
+class PriceHistory:
+    """Fixed-memory price history: one ring buffer per race, runner and series.
+
+    Memory is ``capacity`` points per buffer; races are dropped when they are
+    retired, so a full day's card stays bounded by the number of live races.
+    """
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self._races = {}  # race_key -> runner -> series -> RingBuffer
+
+    def record(self, change):
+        """Record one OddsChange if it is a tracked price or volume."""
+        if change.runner is None:
+            self._races.pop(change.race_key, None)
+            return
+        series = SERIES_FIELDS.get((change.source, change.field))
+        if series is None:
+            return
+        runners = self._races.setdefault(change.race_key, {})
+        buffers = runners.setdefault(change.runner, {})
+        buffer = buffers.get(series)
+        if buffer is None:
+            buffer = buffers[series] = RingBuffer(self.capacity)
+        buffer.append(change.timestamp, to_float(change.new))
+
+    def record_many(self, changes):
+        for change in changes:
+            self.record(change)
+
+    def runners(self, race_key):
+        return list(self._races.get(race_key, {}))
+
+    def series(self, race_key, runner, series, start=None, end=None, max_points=500, method="minmax"):
+        """Return (ts, values) for a window, downsampled to at most ``max_points``.
+
+        Missing prices (NaN) are left out rather than drawn as gaps.
+        """
+        buffer = self._races.get(race_key, {}).get(runner, {}).get(series)
+        if buffer is None:
+            return np.empty(0), np.empty(0, dtype=np.float32)
+        ts, values = buffer.window(start, end)
+        present = ~np.isnan(values)
+        ts, values = ts[present], values[present]
+        return DOWNSAMPLERS[method](ts, values, max_points)
+
+
+price_history = PriceHistory()
@@ -0,0 +1,212 @@
+from collections import namedtuple
+import numpy as np
+from data.runner_odds import price, to_float
+
+# Betfair's commission on net winnings, by race type
+COMMISSION_RATES = {"greyhound": 0.08}
+DEFAULT_COMMISSION_RATE = 0.10
+
+# The dashboard figures for one race. ``best_ev`` sums each runner's lower implied
+# probability across the two bookmakers; ``alt_ev`` is the better of 1 / book total.
+RaceSummary = namedtuple("RaceSummary", ["sportsbet_total", "betfair_total", "best_ev", "alt_ev"])
+
+
+def betfair_commission_rate(race_type):
+    """Return the Betfair commission rate based on race type."""
+    return COMMISSION_RATES.get(race_type, DEFAULT_COMMISSION_RATE)
+
+
+def betfair_payout(odds, race_type):
+    """Decimal payout of Betfair back odds once commission comes off the winnings."""
+    if not odds or odds <= 0:
+        return 0
+    return (odds - 1) * (1 - betfair_commission_rate(race_type)) + 1
+
+
+def race_summary(race_data, race_type):
+    """Book totals and EVs for one race's merged odds ({runner: {source: entry}}).
+
+    Only runners priced by both bookmakers count towards the totals.
+    """
+    total_sb_prob = 0
+    total_bf_prob = 0
+    best_ev = 0
+
+    for row in race_data.values():
+        sb_odds = price(row, "sportsbet", "1st_back")
+        bf_odds = price(row, "betfair", "1st_back")
+
+        if sb_odds > 0 and bf_odds > 0:
+            sb_prob = 1 / sb_odds if sb_odds > 0 else 0
+            bf_payout = betfair_payout(bf_odds, race_type)
+            bf_prob = 1 / bf_payout if bf_payout > 0 else 0
+
+            total_sb_prob += sb_prob
+            total_bf_prob += bf_prob
+
+            # Take the lower probability (higher odds) for each horse
+            best_ev += min(sb_prob, bf_prob)
+
+    alt_ev_sb = 1 / total_sb_prob if total_sb_prob > 0 else 0
+    alt_ev_bf = 1 / total_bf_prob if total_bf_prob > 0 else 0
+    return RaceSummary(total_sb_prob, total_bf_prob, best_ev, max(alt_ev_sb, alt_ev_bf))
+
+
+LADDER_LEVELS = ("1st", "2nd", "3rd")
+
+
+def _price_columns():
+    """(source, field) -> column: the dashboard's four prices first, then the rest
+    of the exchange's three-level ladder, for the liquidity engine."""
+    columns = {
+        ("sportsbet", "1st_back"): 0,
+        ("betfair", "1st_back"): 1,
+        ("betfair", "1st_lay"): 2,
+        ("betfair", "1st_back_dom"): 3,
+    }
+    for level in LADDER_LEVELS:
+        for field in ("back", "lay", "back_dom", "lay_dom"):
+            columns.setdefault(("betfair", f"{level}_{field}"), len(columns))
+    return columns
+
+
+# (source, field) -> column of PricingEngine.prices
+PRICE_COLUMNS = _price_columns()
+SB_BACK, BF_BACK, BF_LAY, BF_BACK_DOM = range(4)
+SOURCE_COLUMNS = {
+    source: [column for (col_source, _), column in PRICE_COLUMNS.items() if col_source == source]
+    for source in ("sportsbet", "betfair")
+}
+
+
+class PricingEngine:
+    """Every live race's prices in one (race x runner x column) array, priced in one pass.
+
+    Rows are races, indexed by race key, and the runner axis is the per-race runner
+    id, so OddsChange events write straight into place. ``compute`` then derives the
+    dashboard figures (RaceSummary) and both books' totals for every race at once
+    with NumPy, and only reruns after something changed.
+    """
+
+    def __init__(self, races=64, runners=24):
+        self.prices = np.full((races, runners, len(PRICE_COLUMNS)), np.nan)
+        self.commission = np.full(races, DEFAULT_COMMISSION_RATE)
+        self._rows = {}   # race_key -> row
+        self._free = list(range(races - 1, -1, -1))
+        self._race_types = {}
+        self.version = 0  # bumped on every change, so results can be cached against it
+        self._computed_version = None
+        self._results = {}
+
+    def _grow(self, races, runners):
+        old_races, old_runners, columns = self.prices.shape
+        prices = np.full((races, runners, columns), np.nan)
+        prices[:old_races, :old_runners] = self.prices
+        self.prices = prices
+        if races > old_races:
+            self.commission = np.concatenate((self.commission, np.full(races - old_races, DEFAULT_COMMISSION_RATE)))
+            self._free[:0] = range(races - 1, old_races - 1, -1)
+
+    def _row(self, race_key):
+        row = self._rows.get(race_key)
+        if row is None:
+            if not self._free:
+                self._grow(self.prices.shape[0] * 2, self.prices.shape[1])
+            row = self._rows[race_key] = self._free.pop()
+            self.commission[row] = betfair_commission_rate(self._race_types.get(race_key))
+        return row
+
+    @property
+    def rows(self):
+        """{race_key: row of ``prices``} for every race with prices."""
+        return self._rows
+
+    def set_race_type(self, race_key, race_type):
+        """Set the race type a race's Betfair commission is taken at."""
+        self._race_types[race_key] = race_type
+        row = self._rows.get(race_key)
+        if row is not None:
+            self.commission[row] = betfair_commission_rate(race_type)
+            self.version += 1
+
+    def record(self, change):
+        """Apply one OddsChange."""
+        if change.runner is None:
+            row = self._rows.pop(change.race_key, None)
+            if row is not None:
+                self.prices[row] = np.nan
+                self._free.append(row)
+                self.version += 1
+            return
+
+        if change.field is None:
+            columns = SOURCE_COLUMNS.get(change.source)
+        else:
+            column = PRICE_COLUMNS.get((change.source, change.field))
+            columns = None if column is None else [column]
+        if not columns:
+            return
+        if change.field is None and change.race_key not in self._rows:
+            return  # a runner removed from a race that's already gone
+
+        row = self._row(change.race_key)
+        runner = change.runner
+        if runner >= self.prices.shape[1]:
+            self._grow(self.prices.shape[0], max(runner + 1, self.prices.shape[1] * 2))
+        # A removed runner (field None) loses all of that source's prices
+        value = np.nan if change.field is None else to_float(change.new)
+        self.prices[row, runner, columns] = value
+        self.version += 1
+
+    def record_many(self, changes):
+        for change in changes:
+            self.record(change)
+
+    def compute(self):
+        """Price every race; returns {race_key: (RaceSummary, sb_book_total, bf_book_total, bf_payouts)}."""
+        if self._computed_version == self.version:
+            return self._results
+
+        sb = self.prices[..., SB_BACK]
+        bf = self.prices[..., BF_BACK]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            payouts = np.where(bf > 0, (bf - 1) * (1 - self.commission[:, None]) + 1, 0)
+            sb_prob = np.where(sb > 0, 1 / sb, 0)
+            bf_prob = np.where(payouts > 0, 1 / payouts, 0)
+
+            # The dashboard only counts runners both bookmakers price
+            both = (sb > 0) & (bf > 0)
+            sb_total = np.where(both, sb_prob, 0).sum(axis=1)
+            bf_total = np.where(both, bf_prob, 0).sum(axis=1)
+            best_ev = np.where(both, np.minimum(sb_prob, bf_prob), 0).sum(axis=1)
+            alt_ev = np.maximum(np.where(sb_total > 0, 1 / sb_total, 0), np.where(bf_total > 0, 1 / bf_total, 0))
+
+            # The detail view's book totals count every priced runner
+            sb_book = sb_prob.sum(axis=1)
+            bf_book = bf_prob.sum(axis=1)
+
+        self._results = {
+            race_key: (RaceSummary(float(sb_total[row]), float(bf_total[row]), float(best_ev[row]), float(alt_ev[row])),
+                       float(sb_book[row]), float(bf_book[row]), payouts[row])
+            for race_key, row in self._rows.items()
+        }
+        self._computed_version = self.version
+        return self._results
+
+    def summary(self, race_key):
+        """The dashboard RaceSummary for one race, or None if it has no prices."""
+        result = self.compute().get(race_key)
+        return result[0] if result else None
+
+    def book_totals(self, race_key):
+        """(Sportsbet, Betfair after commission) implied-probability totals over every priced runner."""
+        result = self.compute().get(race_key)
+        return (result[1], result[2]) if result else (0, 0)
+
+    def payouts(self, race_key):
+        """Commission-adjusted Betfair payouts indexed by runner id (0 where unpriced)."""
+        result = self.compute().get(race_key)
+        return result[3] if result else np.zeros(0)
+
+
+pricing_engine = PricingEngine()
@@ -0,0 +1,106 @@
+import math
+from array import array
+from collections.abc import Mapping
+
+# Every exchange ladder cell: three levels of back and lay prices and their volumes
+LADDER_FIELDS = tuple(
+    f"{level}_{side}{suffix}"
+    for level in ("1st", "2nd", "3rd") for side in ("back", "lay") for suffix in ("", "_dom")
+)
+FIELD_INDEX = {field: i for i, field in enumerate(LADDER_FIELDS)}
+INFO_FIELDS = ("display_name", "number", "fluctuations")
+_MISSING = array("d", [math.nan]) * len(LADDER_FIELDS)
+
+
+def to_float(value):
+    """Convert a scraped price or volume ("3.5", "$1,234", 2.4, None) to a float, NaN if missing."""
+    if value is None:
+        return math.nan
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(str(value).replace('$', '').replace(',', ''))
+    except ValueError:
+        return math.nan
+
+
+def _restore(display_name, number, prices, fluctuations):
+    return RunnerOdds._from_array(display_name, number, prices, fluctuations)
+
+
+class RunnerOdds(Mapping):
+    """One bookmaker's odds for one runner, parsed to floats once when scraped.
+
+    Ladder prices and volumes live in one array of doubles (NaN where missing),
+    next to the runner's display name, saddle number and, for Sportsbet, its
+    fluctuations. It reads like the old per-runner dict: ``entry["1st_back"]``,
+    ``entry.get("display_name")``, and iteration yields every field, so
+    ``diff_odds`` and the odds channel work on it unchanged. Setting a ladder
+    field parses the value with ``to_float``.
+    """
+    __slots__ = ("display_name", "number", "prices", "fluctuations")
+
+    def __init__(self, display_name="", number=None, prices=None, fluctuations=None):
+        self.display_name = display_name
+        self.number = number
+        self.fluctuations = fluctuations
+        self.prices = array("d", _MISSING)
+        for field, value in (prices or {}).items():
+            self[field] = value
+
+    @classmethod
+    def _from_array(cls, display_name, number, prices, fluctuations):
+        entry = cls.__new__(cls)
+        entry.display_name = display_name
+        entry.number = number
+        entry.prices = prices[:]
+        entry.fluctuations = fluctuations
+        return entry
+
+    def copy(self):
+        entry = RunnerOdds.__new__(RunnerOdds)
+        entry.display_name = self.display_name
+        entry.number = self.number
+        entry.prices = self.prices[:]
+        entry.fluctuations = self.fluctuations
+        return entry
+
+    def __reduce__(self):
+        return _restore, (self.display_name, self.number, self.prices, self.fluctuations)
+
+    def __getitem__(self, field):
+        index = FIELD_INDEX.get(field)
+        if index is not None:
+            return self.prices[index]
+        if field in INFO_FIELDS:
+            return getattr(self, field)
+        raise KeyError(field)
+
+    def __setitem__(self, field, value):
+        index = FIELD_INDEX.get(field)
+        if index is not None:
+            self.prices[index] = value if type(value) is float else to_float(value)
+        elif field in INFO_FIELDS:
+            setattr(self, field, value)
+        else:
+            raise KeyError(field)
+
+    def __iter__(self):
+        yield from INFO_FIELDS
+        yield from LADDER_FIELDS
+
+    def __len__(self):
+        return len(INFO_FIELDS) + len(LADDER_FIELDS)
+
+    def __repr__(self):
+        prices = {field: value for field, value in zip(LADDER_FIELDS, self.prices) if not math.isnan(value)}
+        return f"RunnerOdds({self.display_name!r}, {self.number!r}, {prices})"
+
+
+def price(row, source, field, default=math.nan):
+    """One price of a merged runner row ({source: entry}) as a float, ``default`` if missing."""
+    entry = row.get(source)
+    value = entry.get(field) if entry else None
+    if type(value) is not float:
+        value = to_float(value)
+    return default if math.isnan(value) else value
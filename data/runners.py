@@ -0,0 +1,108 @@
+import re
+from difflib import SequenceMatcher
+
+SAME_NUMBER_SCORE = 0.6  # name similarity needed when the saddle numbers agree
+NAME_ONLY_SCORE = 0.85   # ...and when either site has no number
+
+
+def clean_runner_name(name):
+    """Display form of a runner name, the same for every bookmaker.
+
+    Drops saddle-number prefixes ("1. "), barrier suffixes (" (3)"), non-breaking
+    spaces, apostrophes and dots.
+    """
+    name = str(name or "").replace('\xa0', ' ').strip()
+    name = re.sub(r"^\d+\.\s*", "", name)
+    name = re.sub(r"\s*\(\d+\)", "", name)
+    name = name.replace("'", "").replace(".", "")
+    return re.sub(r"\s+", " ", name).strip()
+
+
+def normalize_runner_name(name):
+    """The key form of a runner name: cleaned and lowercased."""
+    return clean_runner_name(name).lower()
+
+
+def runner_name(row):
+    """Display name of a merged runner row ({source: entry}), from whichever source has one."""
+    for entry in row.values():
+        if entry.get("display_name"):
+            return entry["display_name"]
+    return ""
+
+
+def _saddle_number(entry):
+    try:
+        return int(entry.get("number"))
+    except (TypeError, ValueError):
+        return None
+
+
+class RunnerIdentity:
+    """Stable integer runner ids for one race, shared by every bookmaker.
+
+    Each source's runner key is resolved once, the first time it is seen: to an
+    existing runner with the same normalized name, else one with the same saddle
+    number and a similar name, else the closest fuzzy name, else a new id. Fuzzy
+    matches never cross two known, different saddle numbers. Sources must only
+    give an entry a ``number`` when it is the real saddle number (not a row index),
+    since numbers both lower the name similarity needed and veto matches. After
+    that a source's runners map straight to their ids, and merged odds can be kept
+    in arrays indexed by runner id.
+    """
+
+    def __init__(self):
+        self.names = []    # runner id -> normalized name
+        self.numbers = []  # runner id -> saddle number (None if unknown)
+        self._ids = {}     # (source, runner key) -> runner id
+        self._claimed = {}  # source -> runner ids already taken by that source
+
+    def __len__(self):
+        return len(self.names)
+
+    def _claim(self, source, key, runner_id, number):
+        if self.numbers[runner_id] is None:
+            self.numbers[runner_id] = number
+        self._claimed[source].add(runner_id)
+        self._ids[(source, key)] = runner_id
+
+    def _resolve(self, source, runners):
+        """Resolve new (key, entry) pairs: exact names first, so a near-miss can't take them."""
+        claimed = self._claimed.setdefault(source, set())
+        free_names = {name: i for i, name in enumerate(self.names) if i not in claimed}
+
+        unmatched = []
+        for key, entry in runners:
+            name = normalize_runner_name(entry.get("display_name") or key)
+            number = _saddle_number(entry)
+            runner_id = free_names.pop(name, None)
+            if runner_id is None:
+                unmatched.append((key, name, number))
+            else:
+                self._claim(source, key, runner_id, number)
+
+        for key, name, number in unmatched:
+            runner_id, best_score = None, 0
+            for i in range(len(self.names)):
+                if i in claimed:
+                    continue
+                known = number is not None and self.numbers[i] is not None
+                if known and number != self.numbers[i]:
+                    continue  # e.g. "Miss X" (3) and "Mr X" (7) are different runners
+                score = SequenceMatcher(None, name, self.names[i]).ratio()
+                needed = SAME_NUMBER_SCORE if known else NAME_ONLY_SCORE
+                if score >= needed and score > best_score:
+                    runner_id, best_score = i, score
+            if runner_id is None:
+                runner_id = len(self.names)
+                self.names.append(name)
+                self.numbers.append(number)
+            self._claim(source, key, runner_id, number)
+
+    def assign(self, source, horse_data):
+        """Re-key one source's latest_odds ({runner key: entry}) by runner id."""
+        new = [(key, entry) for key, entry in horse_data.items() if (source, key) not in self._ids]
+        if new:
+            self._resolve(source, new)
+        ids = self._ids
+        return {ids[(source, key)]: entry for key, entry in horse_data.items()}
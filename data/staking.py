@@ -0,0 +1,146 @@
+from collections import namedtuple
+import numpy as np
+from data.pricing import BF_BACK, BF_LAY, SB_BACK, pricing_engine
+
+DEFAULT_BANKROLL = 100.0
+
+# Smallest stake each bookmaker accepts, and the increment stakes are rounded down to
+MIN_STAKES = {"sportsbet": 1.0, "betfair": 5.0}
+STAKE_STEPS = {"sportsbet": 0.5, "betfair": 0.01}
+
+# Columns of StakePlan.stakes
+STAKE_COLUMNS = ("sportsbet_back", "betfair_back", "betfair_lay")
+SB_STAKE, BF_BACK_STAKE, BF_LAY_STAKE = range(3)
+
+# How one race's bankroll is split. ``strategy`` is "dutch" (back every runner at its
+# best price so every outcome returns the same) or "back_lay" (back one runner on
+# Sportsbet and lay it on Betfair). ``stakes`` is (runners x STAKE_COLUMNS), indexed
+# by runner id; lay stakes are backer's stakes, so the liability is stake * (lay - 1).
+# ``outlay`` is the money committed and ``profit`` the worst-case profit after commission.
+StakePlan = namedtuple("StakePlan", ["strategy", "stakes", "outlay", "profit"])
+
+
+def round_down(stakes, step):
+    """Round stakes down to a bookmaker's increment."""
+    # The small epsilon stops float noise (e.g. 4.999999) dropping a whole step
+    return np.floor(stakes / step + 1e-9) * step
+
+
+def _dutch(back, payout, present, bankroll):
+    """Back every runner at its better payout so each outcome returns the same amount."""
+    sportsbet = np.where(back > 0, back, 0)
+    use_betfair = payout > sportsbet
+    best = np.maximum(sportsbet, payout)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        inv = np.where(best > 0, 1 / best, 0)
+        book = inv.sum(axis=1)
+        raw = bankroll * inv / book[:, None]
+    step = np.where(use_betfair, STAKE_STEPS["betfair"], STAKE_STEPS["sportsbet"])
+    minimum = np.where(use_betfair, MIN_STAKES["betfair"], MIN_STAKES["sportsbet"])
+    stakes = np.where(present & (best > 0), round_down(np.nan_to_num(raw), step), 0)
+
+    # Every runner in the race has to be covered, at or above the bookmaker minimum
+    valid = present.any(axis=1) & ~(present & ((best <= 0) | (stakes < minimum))).any(axis=1)
+    outlay = stakes.sum(axis=1)
+    worst_return = np.where(present, stakes * best, np.inf).min(axis=1)
+    profit = np.where(valid, worst_return - outlay, -np.inf)
+
+    placed = np.zeros(stakes.shape + (len(STAKE_COLUMNS),))
+    placed[..., SB_STAKE] = np.where(use_betfair, 0, stakes)
+    placed[..., BF_BACK_STAKE] = np.where(use_betfair, stakes, 0)
+    return placed, outlay, profit
+
+
+def _back_lay(back, lay, commission, bankroll):
+    """Back the best runner on Sportsbet and lay it on Betfair so win or lose pays the same.
+
+    Backing b at S and laying l at L equalizes when l = b * S / (L - c), for a
+    guaranteed profit of b * (S * (1 - c) / (L - c) - 1).
+    """
+    c = commission[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        usable = (back > 1) & (lay > 1)
+        unit_capital = 1 + back * (lay - 1) / (lay - c)  # capital per $1 backed
+        margin = back * (1 - c) / (lay - c) - 1
+        rate = np.where(usable, margin / unit_capital, -np.inf)
+
+    races = np.arange(back.shape[0])
+    runner = rate.argmax(axis=1)
+    S, L = back[races, runner], lay[races, runner]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        back_stake = round_down(np.nan_to_num(bankroll / unit_capital[races, runner]), STAKE_STEPS["sportsbet"])
+        lay_stake = round_down(np.nan_to_num(back_stake * S / (L - commission)), STAKE_STEPS["betfair"])
+
+    valid = (np.isfinite(rate[races, runner]) & (back_stake >= MIN_STAKES["sportsbet"])
+             & (lay_stake >= MIN_STAKES["betfair"]))
+    outlay = back_stake + lay_stake * (L - 1)
+    wins = back_stake * (S - 1) - lay_stake * (L - 1)
+    loses = -back_stake + lay_stake * (1 - commission)
+    profit = np.where(valid, np.minimum(wins, loses), -np.inf)
+
+    placed = np.zeros(back.shape + (len(STAKE_COLUMNS),))
+    placed[races, runner, SB_STAKE] = np.where(valid, back_stake, 0)
+    placed[races, runner, BF_LAY_STAKE] = np.where(valid, lay_stake, 0)
+    return placed, np.where(valid, outlay, 0), profit
+
+
+class StakeAllocator:
+    """Splits a bankroll across every race's runners and bookmakers in one pass.
+
+    Reads the pricing engine's arrays and, per race, keeps whichever of the dutch
+    and back/lay plans has the higher worst-case profit after Betfair commission
+    and rounding to each bookmaker's minimum stake and increment. A race only gets
+    a plan if that profit is positive; otherwise there is nothing worth betting.
+    Plans are cached until the engine's prices or the bankroll change.
+    """
+
+    def __init__(self, engine=pricing_engine, bankroll=DEFAULT_BANKROLL):
+        self.engine = engine
+        self.bankroll = bankroll
+        self._key = None
+        self._plans = {}
+        # The last allocation as (race x ...) arrays, in the pricing engine's row order
+        self.stakes = np.zeros((0, 0, len(STAKE_COLUMNS)))
+        self.outlay = self.profit = np.zeros(0)
+
+    def allocate(self):
+        """Return {race_key: StakePlan} for every race (strategy None unless it locks in a profit)."""
+        key = (self.engine.version, self.bankroll)
+        if key == self._key:
+            return self._plans
+
+        prices = self.engine.prices
+        back, betfair_back, lay = prices[..., SB_BACK], prices[..., BF_BACK], prices[..., BF_LAY]
+        commission = self.engine.commission
+        present = ~(np.isnan(back) & np.isnan(betfair_back) & np.isnan(lay))
+        payout = np.where(betfair_back > 0, (betfair_back - 1) * (1 - commission[:, None]) + 1, 0)
+
+        dutch = _dutch(back, payout, present, self.bankroll)
+        back_lay = _back_lay(back, lay, commission, self.bankroll)
+        use_dutch = dutch[2] >= back_lay[2]
+        stakes = np.where(use_dutch[:, None, None], dutch[0], back_lay[0])
+        outlay = np.where(use_dutch, dutch[1], back_lay[1])
+        profit = np.where(use_dutch, dutch[2], back_lay[2])
+        # A losing or break-even plan is no plan at all
+        profitable = profit > 0
+        stakes = np.where(profitable[:, None, None], stakes, 0)
+        outlay = np.where(profitable, outlay, 0)
+        profit = np.where(profitable, profit, -np.inf)
+
+        plans = {}
+        for race_key, row in self.engine.rows.items():
+            if not np.isfinite(profit[row]):
+                plans[race_key] = StakePlan(None, np.zeros_like(stakes[row]), 0.0, 0.0)
+                continue
+            strategy = "dutch" if use_dutch[row] else "back_lay"
+            plans[race_key] = StakePlan(strategy, stakes[row], float(outlay[row]), float(profit[row]))
+        self._key, self._plans = key, plans
+        self.stakes, self.outlay, self.profit = stakes, outlay, profit
+        return plans
+
+    def plan(self, race_key):
+        return self.allocate().get(race_key)
+
+
+stake_allocator = StakeAllocator()
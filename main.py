@@ -1,88 +1,95 @@
 import asyncio
-from scrapers.betfair.race import BetfairRace
-from scrapers.sportsbet.race import SportsbetRace
-from scrapers.betfair.browser import BrowserManager
+from scrapers.betfair.browser import ShardedBrowserManager
+from scrapers.betfair.routing import RoutePolicy
+from scrapers.lifecycle import RaceLifecycleManager
+from scrapers.parse_pool import ParsePool
+from scrapers.scheduler import PollScheduler
 from ui.app import launch_ui
-from data.odds_store import shared_odds
-from utils.match_races import load_matched_races
+from data.odds_store import shared_odds, odds_events
+from data.price_history import price_history
+from data.pricing import pricing_engine
+from utils.match_races import get_all_scrapers, is_future_race, load_matched_races
+from utils.race_cache import REFRESH_INTERVAL, RaceCache
 from utils.logger import setup_logger
-from collections import defaultdict
 
 logger = setup_logger("Main")
 
-# Dictionary to store odds for each race
-race_odds = defaultdict(dict)
+async def merge_odds(events):
+    """Apply scraper deltas to the odds store and forward them to downstream subscribers."""
+    while True:
+        # Take everything that has queued up since the last pass in one batch
+        changes = [await events.get()]
+        while not events.empty():
+            changes.append(events.get_nowait())
 
-async def coordinator():
-    async with BrowserManager() as context:
-        matched_races = await load_matched_races(tommorow=False)
-        # Limit to first 5 races
-        matched_races = matched_races[:5]
-        logger.info(f"Processing {len(matched_races)} races")
-        
-        # Create race objects for each matched race
-        race_objects = []
+        # Each batch becomes one new store version, swapped in atomically
+        shared_odds.apply(changes)
+        price_history.record_many(changes)
+        pricing_engine.record_many(changes)
+        odds_events.publish(changes)
+
+async def refresh_races(context, lifecycle, cache, interval=REFRESH_INTERVAL, on_match=None):
+    """Keep the race cache current in the background.
+
+    Each pass hands new or changed races to the lifecycle manager as they match,
+    then drops races that are no longer listed.
+    """
+    scrapers = await get_all_scrapers(context)
+    while True:
         try:
-            # Initialize all race objects concurrently
-            init_tasks = []
-            for race in matched_races:
-                sb = SportsbetRace(race['sportsbet']['url'], context)
-                bf = BetfairRace(race['betfair']['url'], context)
-                race_objects.append((sb, bf))
-                init_tasks.extend([
-                    asyncio.create_task(sb.initialize()),
-                    asyncio.create_task(bf.initialize())
-                ])
-            
-            # Wait for all initializations to complete
-            logger.info("Initializing all race pages concurrently")
-            await asyncio.gather(*init_tasks)
-            logger.info("All race pages initialized successfully")
+            async for match in cache.refresh(scrapers):
+                if not is_future_race(match):
+                    continue
+                lifecycle.add(match)
+                if on_match:
+                    on_match(match)
+            for race_key in cache.removed:
+                lifecycle.discard(race_key)
+        except Exception as e:
+            logger.error(f"Race refresh failed: {e}")
+        await asyncio.sleep(interval)
 
-            async def update_odds():
-                while True:
-                    # Update odds for each race
-                    for idx, (sb, bf) in enumerate(race_objects):
-                        race_key = f"{matched_races[idx]['betfair']['location']}_R{matched_races[idx]['betfair']['race_number']}"
-                        
-                        # Update odds for this race
-                        race_odds[race_key] = {}
-                        for horse in set(sb.latest_odds) | set(bf.latest_odds):
-                            race_odds[race_key][horse] = {
-                                "sportsbet": sb.latest_odds.get(horse, {}),
-                                "betfair": bf.latest_odds.get(horse, {})
-                            }
-                    
-                    # Update shared_odds with all race data
-                    shared_odds.clear()
-                    shared_odds.update({
-                        'races': race_odds,
-                        'current_race_index': 0  # This will be updated by the UI when user selects a race
-                    })
-                    
-                    await asyncio.sleep(1)
+async def coordinator(on_match=None, record_dir=None):
+    route_policy = RoutePolicy()
+    async with ShardedBrowserManager(route_policy=route_policy) as context:
+        # Cached races start straight away; the background refresh adds the rest as they match
+        matched_races = await load_matched_races(tommorow=False)
+        logger.info(f"Following {len(matched_races)} cached races")
 
-            # Start streaming odds for all races
-            stream_tasks = []
-            for sb, bf in race_objects:
-                stream_tasks.extend([
-                    asyncio.create_task(sb.stream_odds()),
-                    asyncio.create_task(bf.stream_odds())
-                ])
-            
-            # Start the odds update task
-            update_task = asyncio.create_task(update_odds())
-            
+        # Scrapers publish per-runner changes here instead of being polled for full snapshots
+        events = asyncio.Queue()
+
+        # Poll every live race at a rate set by its time to jump, and only keep
+        # pages open for races inside the lookahead window
+        scheduler = PollScheduler()
+        # Page HTML is parsed in worker processes, spread across cores
+        parse_pool = ParsePool()
+        # Betfair odds come from the market-book responses the page already fetches,
+        # so its pages are never serialized and re-parsed per tick
+        betfair_options = {"mode": "network", "parse_pool": parse_pool}
+        # Sportsbet rows are read in the live page and pushed as they change; the
+        # scheduled refresh is only a safety net and never reloads the page
+        sportsbet_options = {"mode": "evaluate", "push": True, "parse_pool": parse_pool}
+        # record_dir logs every raw payload for offline replay (python -m scrapers.replay)
+        lifecycle = RaceLifecycleManager(context, scheduler, events=events, record_dir=record_dir,
+                                         sportsbet_options=sportsbet_options,
+                                         betfair_options=betfair_options)
+        for race in matched_races:
+            lifecycle.add(race)
+
+        try:
             # Wait for all tasks to complete
-            await asyncio.gather(*stream_tasks, update_task)
+            await asyncio.gather(scheduler.run(), lifecycle.run(), merge_odds(events),
+                                 refresh_races(context, lifecycle, RaceCache(), on_match=on_match))
             
         except Exception as e:
             logger.error(f"Error in coordinator: {e}")
-            # Cleanup race objects
-            for sb, bf in race_objects:
-                await sb.cleanup()
-                await bf.cleanup()
+        finally:
+            # Cleanup race pages and recordings, also when the coordinator is cancelled
+            await lifecycle.close_all()
+            route_policy.log_stats()
+            parse_pool.shutdown()
 
 if __name__ == "__main__":
-    launch_ui(coordinator, matched_races=load_matched_races)
-    
\ No newline at end of file
+    # Scrape in a separate process so parsing and page refreshes never stall the GUI
+    launch_ui(coordinator, matched_races=load_matched_races, separate_process=True)
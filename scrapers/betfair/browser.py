@@ -1,25 +1,145 @@
+import asyncio
+import os
 from playwright.async_api import async_playwright
 
+LAUNCH_ARGS = ["--disable-blink-features=AutomationControlled"]
+CONTEXT_OPTIONS = {
+    "user_agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)...",
+    "viewport": {"width": 1920, "height": 1080},
+    "locale": "en-US",
+}
+STEALTH_SCRIPT = """
+    Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
+    window.navigator.chrome = { runtime: {} };
+    Object.defineProperty(navigator, 'languages', { get: () => ['en-US', 'en'] });
+    Object.defineProperty(navigator, 'plugins', { get: () => [1, 2, 3, 4, 5] });
+"""
+
+
+async def launch_context(playwright, route_policy=None):
+    """Launch a headless Chromium and return (browser, context) with our stealth setup.
+
+    If a RoutePolicy is given it is installed on the context before any page opens.
+    """
+    browser = await playwright.chromium.launch(headless=True, args=LAUNCH_ARGS)
+    context = await browser.new_context(**CONTEXT_OPTIONS)
+    await context.add_init_script(STEALTH_SCRIPT)
+    if route_policy is not None:
+        await route_policy.attach(context)
+    return browser, context
+
+
 class BrowserManager:
+    def __init__(self, route_policy=None):
+        self.route_policy = route_policy
+
     async def __aenter__(self):
         self.playwright = await async_playwright().start()
-        self.browser = await self.playwright.chromium.launch(
-            headless=True,
-            args=["--disable-blink-features=AutomationControlled"]
-        )
-        self.context = await self.browser.new_context(
-            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64)...",
-            viewport={"width": 1920, "height": 1080},
-            locale="en-US"
-        )
-        await self.context.add_init_script("""
-            Object.defineProperty(navigator, 'webdriver', { get: () => undefined });
-            window.navigator.chrome = { runtime: {} };
-            Object.defineProperty(navigator, 'languages', { get: () => ['en-US', 'en'] });
-            Object.defineProperty(navigator, 'plugins', { get: () => [1, 2, 3, 4, 5] });
-        """)
+        self.browser, self.context = await launch_context(self.playwright, self.route_policy)
         return self.context
 
     async def __aexit__(self, exc_type, exc, tb):
         await self.browser.close()
-        await self.playwright.stop()
\ No newline at end of file
+        await self.playwright.stop()
+
+
+class BrowserShard:
+    """One Playwright driver + Chromium process + context, with a pool of idle pages."""
+
+    def __init__(self, index, route_policy=None):
+        self.index = index
+        self.route_policy = route_policy
+        self.playwright = None
+        self.browser = None
+        self.context = None
+        self.idle_pages = []
+        self.live_pages = 0
+
+    async def start(self):
+        # A driver per shard, so the driver isn't the single bottleneck either
+        self.playwright = await async_playwright().start()
+        self.browser, self.context = await launch_context(self.playwright, self.route_policy)
+
+    async def stop(self):
+        try:
+            await self.browser.close()
+        finally:
+            await self.playwright.stop()
+
+
+class ShardedContext:
+    """Stands in for a BrowserContext across several browser shards.
+
+    ``new_page()`` hands out a page from the least loaded shard, reusing an idle
+    pooled page when there is one. ``release_page()`` returns a page to its shard's
+    pool instead of closing it. Pages closed directly are simply forgotten.
+    """
+
+    def __init__(self, shards, pool_size=4):
+        self.shards = shards
+        self.pool_size = pool_size
+        self._owners = {}  # page -> shard
+
+    async def new_page(self):
+        shard = min(self.shards, key=lambda s: s.live_pages)
+        page = None
+        while shard.idle_pages and page is None:
+            candidate = shard.idle_pages.pop()
+            if not candidate.is_closed():
+                page = candidate
+        if page is None:
+            page = await shard.context.new_page()
+            page.on("close", self._forget)
+        self._owners[page] = shard
+        shard.live_pages += 1
+        return page
+
+    async def release_page(self, page):
+        """Return a page to its shard's pool, closing it if the pool is full."""
+        shard = self._owners.pop(page, None)
+        if shard is None:
+            await page.close()
+            return
+        shard.live_pages -= 1
+        if page.is_closed():
+            return
+        if len(shard.idle_pages) >= self.pool_size:
+            await page.close()
+            return
+        try:
+            # Drop the old document (and its timers/observers) before reuse
+            await page.goto("about:blank")
+            shard.idle_pages.append(page)
+        except Exception:
+            await page.close()
+
+    def _forget(self, page):
+        shard = self._owners.pop(page, None)
+        if shard is not None:
+            shard.live_pages -= 1
+        for shard in self.shards:
+            if page in shard.idle_pages:
+                shard.idle_pages.remove(page)
+
+    def load(self):
+        """Live page count per shard."""
+        return [shard.live_pages for shard in self.shards]
+
+
+class ShardedBrowserManager:
+    """Spreads race pages across several browser processes, one per core by default."""
+
+    def __init__(self, shards=None, pool_size=4, route_policy=None):
+        self.shard_count = shards or os.cpu_count() or 1
+        self.pool_size = pool_size
+        self.route_policy = route_policy  # shared, so its stats cover every shard
+        self.shards = []
+
+    async def __aenter__(self):
+        self.shards = [BrowserShard(i, self.route_policy) for i in range(self.shard_count)]
+        await asyncio.gather(*(shard.start() for shard in self.shards))
+        self.context = ShardedContext(self.shards, self.pool_size)
+        return self.context
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await asyncio.gather(*(shard.stop() for shard in self.shards), return_exceptions=True)
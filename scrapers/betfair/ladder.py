@@ -0,0 +1,61 @@
+import re
+from scrapers.html_parser import Partial
+from data.runners import clean_runner_name, normalize_runner_name
+from data.runner_odds import RunnerOdds
+from .market_book import empty_runner
+
+# Only the runner names and ladder labels are needed to rebuild latest_odds
+RUNNER_ROWS = Partial(tags=("h3", "label"), classes=("runner-name", "Zs3u5", "He6+y"))
+PAGE_TITLE = Partial(tags=("title",), classes=())
+
+RUNNER_SELECTOR = "h3.runner-name"
+ODDS_SELECTOR = "label.Zs3u5.AUP11.Qe-26"  # back odds
+DOM_SELECTOR = r"label.He6\+y.Qe-26"       # lay odds
+
+
+def parse_ladder(html, parser):
+    """Parse the runner ladder out of an exchange page into the latest_odds shape."""
+    root = parser.parse(html, only=RUNNER_ROWS)
+
+    runners = root.select(RUNNER_SELECTOR)
+    odds = root.select(ODDS_SELECTOR)
+    dom = root.select(DOM_SELECTOR)
+
+    horse_data = {}
+    i = 0
+    for runner in runners:
+        name = runner.text()
+        display_name = clean_runner_name(name)
+        dict_key = normalize_runner_name(display_name)
+        # Only a "7. Name" prefix is a saddle number; the row order isn't
+        saddle = re.match(r"\s*(\d+)\.", name)
+        number = int(saddle.group(1)) if saddle else None
+        try:
+            oddslist = [odds[i + j].text() for j in range(6)]
+            domlist = [dom[i + j].text() for j in range(6)]
+
+            horse_data[dict_key] = RunnerOdds(display_name, number, {
+                "3rd_back": oddslist[0],
+                "2nd_back": oddslist[1],
+                "1st_back": oddslist[2],
+                "1st_lay": oddslist[3],
+                "2nd_lay": oddslist[4],
+                "3rd_lay": oddslist[5],
+                "3rd_back_dom": domlist[0],
+                "2nd_back_dom": domlist[1],
+                "1st_back_dom": domlist[2],
+                "1st_lay_dom": domlist[3],
+                "2nd_lay_dom": domlist[4],
+                "3rd_lay_dom": domlist[5],
+            })
+        except IndexError:
+            horse_data[dict_key] = empty_runner(display_name, number)
+        i += 6
+
+    return horse_data
+
+
+def parse_title(html, parser):
+    """Return the page <title> text, or None if the page has no title."""
+    title = parser.parse(html, only=PAGE_TITLE).select_one("title")
+    return title.text() if title else None
@@ -0,0 +1,57 @@
+import re
+
+SITE_URL = "https://www.betfair.com.au/exchange/plus/"
+
+# Each race link with its own text/title and the name of the meeting it sits under
+LISTING_LINKS_JS = """
+els => els.map(el => {
+    const meeting = el.closest('[class*="meeting"], [class*="venue"], li, tr');
+    const label = meeting && meeting.querySelector(
+        '[class*="meeting-label"], [class*="meeting-name"], [class*="venue-name"], [class*="name"]'
+    );
+    return {
+        href: el.getAttribute("href"),
+        text: el.textContent.trim(),
+        title: el.getAttribute("title") || "",
+        venue: label ? label.textContent.trim() : "",
+    };
+})
+"""
+
+
+def extract_race_id(url):
+    """The Betfair market id without its "1." prefix."""
+    match = re.search(r"market/1\.(\d+)", url or "")
+    return match.group(1) if match else "Unknown"
+
+
+def extract_event_id(url):
+    """The id caches key a Betfair race on; the market id is already unique per race."""
+    return extract_race_id(url)
+
+
+def parse_listing_entry(race_type, link):
+    """Build race metadata from a listing-page race link, or None if anything is missing.
+
+    Needs the venue, a jump time ("17:11") and a race number ("R5") - races that
+    don't show all three fall back to reading the race page title.
+    """
+    href = link.get("href") or ""
+    race_id_match = re.search(r"market/1\.(\d+)", href)
+    text = f"{link.get('text', '')} {link.get('title', '')}"
+    time_match = re.search(r"\b(\d{2}:\d{2})\b", text)
+    number_match = re.search(r"\bR(\d+)\b", text)
+    location = re.sub(r"\s+", " ", link.get("venue", "")).strip()
+
+    if not (race_id_match and time_match and number_match and location):
+        return None
+
+    return {
+        "race_id": race_id_match.group(1),
+        "location": location,
+        "race_name": location,
+        "race_number": number_match.group(1),
+        "race_time": time_match.group(1),
+        "race_type": race_type,
+        "url": SITE_URL + href,
+    }
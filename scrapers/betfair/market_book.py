@@ -0,0 +1,83 @@
+import re
+from data.runner_odds import RunnerOdds
+from data.runners import clean_runner_name, normalize_runner_name
+
+# The exchange page polls this endpoint for prices; the payload is keyed by selectionId
+# so runners can never be paired with the wrong price cells.
+MARKET_BOOK_PATH = "/exchange/readonly/v1/bymarket"
+
+LADDER_LEVELS = ("1st", "2nd", "3rd")
+
+
+def extract_market_id(url):
+    """Return the exchange market id (e.g. '1.243008133') from a race URL."""
+    match = re.search(r"market/(1\.\d+)", url)
+    return match.group(1) if match else None
+
+
+def is_market_book_response(url, market_id=None):
+    """Check whether a network response URL is a market-book poll (for this market)."""
+    if MARKET_BOOK_PATH not in url:
+        return False
+    return market_id is None or market_id in url
+
+
+def iter_market_nodes(payload):
+    """Walk eventTypes -> eventNodes -> marketNodes in a market-book payload."""
+    for event_type in payload.get("eventTypes", []):
+        for event_node in event_type.get("eventNodes", []):
+            for market_node in event_node.get("marketNodes", []):
+                yield market_node
+
+
+def empty_runner(display_name, number):
+    """A runner entry with every ladder cell missing."""
+    return RunnerOdds(display_name, number)
+
+
+def parse_market_book(payload, market_id, runner_names=None):
+    """Decode a market-book payload into (market_status, horse_data).
+
+    ``runner_names`` maps selectionId -> display name and is updated in place with any
+    runner descriptions found in the payload, since later polls usually omit them.
+    Runners whose name is still unknown are skipped rather than guessed.
+    """
+    if runner_names is None:
+        runner_names = {}
+
+    for market_node in iter_market_nodes(payload):
+        if market_node.get("marketId") != market_id:
+            continue
+
+        status = market_node.get("state", {}).get("status", "UNKNOWN")
+        horse_data = {}
+        for runner in market_node.get("runners", []):
+            selection_id = runner.get("selectionId")
+            description = runner.get("description", {})
+            if description.get("runnerName"):
+                runner_names[selection_id] = clean_runner_name(description["runnerName"])
+
+            display_name = runner_names.get(selection_id)
+            if not display_name:
+                continue
+            # Removed (scratched) runners stay in the book with no prices
+            if runner.get("state", {}).get("status") == "REMOVED":
+                continue
+
+            metadata = description.get("metadata", {})
+            # sortPriority is only the exchange's display order, not a saddle number
+            number = metadata.get("CLOTH_NUMBER")
+            entry = empty_runner(display_name, int(number) if number else None)
+
+            exchange = runner.get("exchange", {})
+            for side, ladder_key in (("back", "availableToBack"), ("lay", "availableToLay")):
+                # Each ladder is already ordered best price first
+                for level, cell in zip(LADDER_LEVELS, exchange.get(ladder_key, [])):
+                    entry[f"{level}_{side}"] = cell.get("price")
+                    entry[f"{level}_{side}_dom"] = cell.get("size")
+
+            horse_data[normalize_runner_name(display_name)] = entry
+
+        return status, horse_data
+
+    return None, {}
@@ -1,29 +1,128 @@
 import re
 import asyncio
-from bs4 import BeautifulSoup
 from utils.logger import setup_logger
+from data.odds_events import diff_odds
+from data.runners import RunnerIdentity
+from scrapers.scheduler import PollScheduler
+from scrapers.html_parser import DEFAULT_PARSER, get_parser
+from .listing import extract_race_id
+from .ladder import parse_ladder, parse_title
+from .market_book import extract_market_id, is_market_book_response, parse_market_book
 
 class BetfairRace:
-    def __init__(self, url: str, context):
+    # "dom" re-parses the page HTML each tick, "network" decodes the market-book
+    # responses the exchange page already fetches
+    MODES = ("dom", "network")
+
+    def __init__(self, url: str, context, mode="dom", parser=DEFAULT_PARSER, race_key=None, events=None, runners=None,
+                 recorder=None, parse_pool=None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown BetfairRace mode: {mode}")
         self.url = url
         self.context = context
+        self.mode = mode
+        self.parser = get_parser(parser)
         self.metadata = {}
         self.latest_odds = {}
+        self.race_key = race_key
+        self.events = events  # optional asyncio.Queue of OddsChange
+        # Shared with the other bookmaker's page for the same race, so both use the same runner ids
+        self.runners = runners if runners is not None else RunnerIdentity()
+        self.market_id = extract_market_id(url)
+        self.market_status = None
+        self.runner_names = {}  # selectionId -> display name, learned from market-book responses
+        self.recorder = recorder  # optional PayloadRecorder for offline replay
+        self.parse_pool = parse_pool  # optional ParsePool, so page HTML is parsed off the event loop
+        if recorder:
+            recorder.start("betfair", url)
         self.logger = setup_logger("BetfairRace")
         self.page = None
+        self._book_received = asyncio.Event()
+        self.closed = False  # set by close(); a closed race never refreshes or publishes again
+        self._idle = asyncio.Event()  # clear while a refresh is in flight
+        self._idle.set()
 
     async def initialize(self):
         """Initialize the persistent page."""
         if not self.page:
             self.page = await self.context.new_page()
+            if self.mode == "network":
+                # Register before navigating so the first market-book poll is captured
+                self.page.on("response", self._on_response)
             await self.page.goto(self.url, timeout=60000)
             await self.page.wait_for_selector(".runner-name", timeout=10000)
 
+    async def _on_response(self, response):
+        """Decode market-book responses straight into latest_odds."""
+        if not is_market_book_response(response.url, self.market_id):
+            return
+        try:
+            payload = await response.json()
+        except Exception as e:
+            self.logger.debug(f"Ignoring undecodable market-book response: {e}")
+            return
+
+        if self.ingest("market_book", payload):
+            self._book_received.set()
+
+    def ingest(self, kind, payload, parsed=None):
+        """Parse one raw payload into latest_odds, recording it first if recording.
+
+        ``kind`` is "market_book" (a decoded market-book response) or "html" (the
+        exchange page), and ``parsed`` an html payload already parsed elsewhere
+        (e.g. by a ParsePool). Returns False for market-book payloads about another market.
+        """
+        if self.closed:
+            return False
+        if self.recorder:
+            self.recorder.record("betfair", kind, payload)
+        if kind == "html":
+            self._set_odds(parsed if parsed is not None else parse_ladder(payload, self.parser))
+            return True
+
+        status, horse_data = parse_market_book(payload, self.market_id, self.runner_names)
+        if status is None:
+            return False
+        self.market_status = status
+        if horse_data:
+            self._set_odds(horse_data)
+        return True
+
+    def _set_odds(self, horse_data):
+        """Replace latest_odds and publish what changed onto the events queue.
+
+        ``horse_data`` is keyed by runner name; latest_odds is keyed by runner id.
+        """
+        if self.closed:
+            return
+        horse_data = self.runners.assign("betfair", horse_data)
+        if self.events is not None:
+            for change in diff_odds(self.race_key, "betfair", self.latest_odds, horse_data):
+                self.events.put_nowait(change)
+        self.latest_odds = horse_data
+
+    async def close(self):
+        """Stop this race for good: wait out any in-flight refresh, then release the page.
+
+        Retired races are closed rather than cleaned up, so a refresh that was already
+        running can't publish odds or reopen a page after the race is gone.
+        """
+        self.closed = True
+        await self._idle.wait()
+        await self.cleanup()
+
     async def cleanup(self):
         """Cleanup resources."""
         if self.page:
             try:
-                await self.page.close()
+                if self.mode == "network":
+                    self.page.remove_listener("response", self._on_response)
+                # Sharded contexts pool pages instead of closing them
+                release_page = getattr(self.context, "release_page", None)
+                if release_page:
+                    await release_page(self.page)
+                else:
+                    await self.page.close()
                 self.page = None
             except:
                 pass
@@ -32,9 +131,7 @@ class BetfairRace:
         try:
             await self.initialize()
             html = await self.page.content()
-            soup = BeautifulSoup(html, "html.parser")
-
-            title = soup.title.string if soup.title else "Unknown Title"
+            title = parse_title(html, self.parser) or "Unknown Title"
             au_match = re.match(r"(\d{2}:\d{2})\s+([\w\s]+?)\s+R(\d+)\s+(\d+m)", title)
             uk_match = re.match(r"(\d{2}:\d{2})\s+([\w\s]+?)\s+(\d+m\d*f?)", title)
 
@@ -47,8 +144,7 @@ class BetfairRace:
                 self.logger.error(f"Unable to extract metadata for race {self.url}")
                 race_time, location, race_number, distance = "Unknown", "Unknown", -1, "Unknown"
 
-            race_id_match = re.search(r'market/1\.(\d+)', self.url)
-            race_id = race_id_match.group(1) if race_id_match else "Unknown"
+            race_id = extract_race_id(self.url)
 
             # Determine race type from URL
             race_type = "greyhound" if "greyhound-racing" in self.url else "horse"
@@ -78,84 +174,55 @@ class BetfairRace:
             }
             return self.metadata
 
-    async def stream_odds(self, interval=5):
+    async def _refresh_from_network(self, timeout=5):
+        """Trigger a market-book poll and wait for _on_response to decode it."""
+        self._book_received.clear()
+        await self.page.locator("button.refresh-btn").click(force=True)
+        await asyncio.wait_for(self._book_received.wait(), timeout=timeout)
+
+    async def _refresh_from_dom(self):
+        """Refresh the page and re-parse the runner ladder from its HTML."""
+        # Refresh the page content
+        refresh_button = self.page.locator("button.refresh-btn")
+        await refresh_button.click(force=True)
+        # Reduced wait time after refresh - we'll wait for content instead
+        await self.page.wait_for_selector(".runner-name", timeout=5000)
+
+        # Get page HTML and parse only the runner rows
+        html = await self.page.content()
+        parsed = None
+        if self.parse_pool:
+            parsed = await self.parse_pool.parse(self, "betfair", html, self.parser.name)
+            if parsed is None:
+                return  # dropped as stale; the next refresh brings a newer page
+        self.ingest("html", html, parsed)
+
+    async def refresh(self):
+        """Fetch one update of the odds, reinitializing the page if it fails."""
+        if self.closed:
+            return
+        self._idle.clear()
         try:
             await self.initialize()
-            
-            while True:
-                try:
-                    # Refresh the page content
-                    refresh_button = self.page.locator("button.refresh-btn")
-                    await refresh_button.click(force=True)
-                    # Reduced wait time after refresh - we'll wait for content instead
-                    await self.page.wait_for_selector(".runner-name", timeout=5000)
-
-                    # Get page HTML and parse it
-                    html = await self.page.content()
-                    soup = BeautifulSoup(html, "html.parser")
-
-                    runners = soup.find_all("h3", class_="runner-name")
-                    odds = soup.find_all("label", class_="Zs3u5 AUP11 Qe-26")  # back odds
-                    dom = soup.find_all("label", class_="He6+y Qe-26")         # lay odds
-
-                    horse_data = {}
-                    i = 0
-                    for idx, runner in enumerate(runners, start=1):
-                        name = runner.text.strip()
-                        # Store original name for display
-                        display_name = name.replace("'", "").replace("'", "").replace(".", "").strip()
-                        # Create lowercase version for dictionary key
-                        dict_key = display_name.lower()
-                        try:
-                            oddslist = [odds[i + j].text.strip() for j in range(6)]
-                            domlist = [dom[i + j].text.strip() for j in range(6)]
-
-                            horse_data[dict_key] = {
-                                "display_name": display_name,
-                                "number": idx,
-                                "3rd_back": oddslist[0],
-                                "2nd_back": oddslist[1],
-                                "1st_back": oddslist[2],
-                                "1st_lay": oddslist[3],
-                                "2nd_lay": oddslist[4],
-                                "3rd_lay": oddslist[5],
-                                "3rd_back_dom": domlist[0],
-                                "2nd_back_dom": domlist[1],
-                                "1st_back_dom": domlist[2],
-                                "1st_lay_dom": domlist[3],
-                                "2nd_lay_dom": domlist[4],
-                                "3rd_lay_dom": domlist[5],
-                            }
-                        except:
-                            horse_data[dict_key] = {
-                                "display_name": display_name,
-                                "number": idx,
-                                "3rd_back": None,
-                                "2nd_back": None,
-                                "1st_back": None,
-                                "1st_lay": None,
-                                "2nd_lay": None,
-                                "3rd_lay": None,
-                                "3rd_back_dom": None,
-                                "2nd_back_dom": None,
-                                "1st_back_dom": None,
-                                "1st_lay_dom": None,
-                                "2nd_lay_dom": None,
-                                "3rd_lay_dom": None,
-                            }
-                        i += 6
-
-                    self.latest_odds = horse_data
-
-                except Exception as e:
-                    self.logger.error(f"Error in stream_odds loop: {e}")
-                    # Try to reinitialize the page if there was an error
-                    await self.cleanup()
-                    await self.initialize()
-
-                await asyncio.sleep(interval)
+            if self.mode == "network":
+                await self._refresh_from_network()
+            else:
+                await self._refresh_from_dom()
 
         except Exception as e:
-            self.logger.error(f"Fatal error in stream_odds: {e}")
+            self.logger.error(f"Error refreshing odds: {e}")
+            # Try to reinitialize the page if there was an error
             await self.cleanup()
-            raise 
\ No newline at end of file
+            if not self.closed:
+                await self.initialize()
+        finally:
+            self._idle.set()
+
+    async def stream_odds(self, interval=5):
+        """Poll this race on its own at a fixed interval.
+
+        The coordinator drives many races through a shared PollScheduler instead.
+        """
+        scheduler = PollScheduler(tiers=(), far_interval=interval)
+        scheduler.add(self)
+        await scheduler.run()
@@ -0,0 +1,154 @@
+from collections import Counter
+from urllib.parse import urlparse
+from utils.logger import setup_logger
+
+# Resource types the odds never depend on
+DEFAULT_BLOCKED_TYPES = frozenset({"image", "font", "media"})
+
+# Analytics, tag managers and ad/session-replay hosts seen on both sites
+THIRD_PARTY_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "facebook.net",
+    "facebook.com",
+    "hotjar.com",
+    "newrelic.com",
+    "nr-data.net",
+    "segment.com",
+    "segment.io",
+    "optimizely.com",
+    "demdex.net",
+    "omtrdc.net",
+    "adobedtm.com",
+    "branch.io",
+    "bing.com",
+    "tiktok.com",
+    "twitter.com",
+    "snapchat.com",
+    "quantummetric.com",
+    "go-mpulse.net",
+)
+
+# Hosts each bookmaker needs to render prices, keyed by the bookmaker's page host.
+# Scripts from anywhere else are treated as third-party.
+BOOKMAKER_ALLOWLISTS = {
+    "betfair.com.au": ("betfair.com.au", "betfair.com", "ppbcdn.com"),
+    "sportsbet.com.au": ("sportsbet.com.au",),
+}
+
+
+def host_matches(host, suffixes):
+    """True if host is one of the suffixes or a subdomain of one."""
+    if not host:
+        return False
+    return any(host == suffix or host.endswith("." + suffix) for suffix in suffixes)
+
+
+class RouteStats:
+    """Request counts, plus transferred bytes when ``measure_bytes`` (audit mode)."""
+
+    def __init__(self, measure_bytes=False):
+        self.measure_bytes = measure_bytes
+        self.allowed_requests = 0
+        self.blocked_requests = 0
+        self.allowed_bytes = 0
+        self.would_block_bytes = 0  # bytes of requests audit mode let through but would block
+        self.blocked_by_reason = Counter()
+
+    def as_dict(self):
+        stats = {
+            "allowed_requests": self.allowed_requests,
+            "blocked_requests": self.blocked_requests,
+            "blocked_by_reason": dict(self.blocked_by_reason),
+        }
+        if self.measure_bytes:
+            stats["allowed_bytes"] = self.allowed_bytes
+            stats["would_block_bytes"] = self.would_block_bytes
+        return stats
+
+
+class RoutePolicy:
+    """A ``context.route`` policy that aborts requests the odds don't need.
+
+    In audit mode nothing is aborted: requests that would have been blocked are
+    counted and their transferred bytes measured, so the saving can be sized
+    before enforcing. Enforcing mode only counts requests, since aborted
+    requests never transfer anything to measure.
+    """
+
+    def __init__(self, blocked_types=DEFAULT_BLOCKED_TYPES, blocked_hosts=THIRD_PARTY_HOSTS,
+                 allowlists=BOOKMAKER_ALLOWLISTS, block_third_party_scripts=True, audit=False):
+        self.blocked_types = frozenset(blocked_types)
+        self.blocked_hosts = tuple(blocked_hosts)
+        self.allowlists = dict(allowlists)
+        self.block_third_party_scripts = block_third_party_scripts
+        self.audit = audit
+        self.stats = RouteStats(measure_bytes=audit)
+        self.logger = setup_logger("RoutePolicy")
+        self._all_allowed = tuple(host for hosts in self.allowlists.values() for host in hosts)
+        self._would_block = {}  # request -> reason, audit mode only
+
+    def allowed_hosts(self, page_url):
+        """The allowlist for the bookmaker a page belongs to (all of them if unknown)."""
+        page_host = urlparse(page_url).hostname if page_url else None
+        for bookmaker_host, hosts in self.allowlists.items():
+            if host_matches(page_host, (bookmaker_host,)):
+                return hosts
+        return self._all_allowed
+
+    def block_reason(self, resource_type, url, page_url=None):
+        """Return why a request should be blocked, or None to let it through."""
+        host = urlparse(url).hostname
+        allowed = self.allowed_hosts(page_url)
+        if host_matches(host, self.blocked_hosts):
+            return "third-party-host"
+        if resource_type in self.blocked_types:
+            return resource_type
+        if self.block_third_party_scripts and resource_type == "script" and not host_matches(host, allowed):
+            return "third-party-script"
+        return None
+
+    async def attach(self, context):
+        """Install the policy on a browser context."""
+        await context.route("**/*", self._handle)
+        if self.audit:
+            context.on("requestfinished", self._on_request_finished)
+            context.on("requestfailed", lambda request: self._would_block.pop(request, None))
+
+    async def _handle(self, route):
+        request = route.request
+        try:
+            page_url = request.frame.url
+        except Exception:
+            page_url = None
+
+        reason = self.block_reason(request.resource_type, request.url, page_url)
+        if reason is None:
+            self.stats.allowed_requests += 1
+            await route.continue_()
+            return
+
+        self.stats.blocked_requests += 1
+        self.stats.blocked_by_reason[reason] += 1
+        if self.audit:
+            self._would_block[request] = reason
+            await route.continue_()
+        else:
+            await route.abort("blockedbyclient")
+
+    async def _on_request_finished(self, request):
+        try:
+            sizes = await request.sizes()
+        except Exception:
+            self._would_block.pop(request, None)
+            return
+        transferred = sizes.get("responseBodySize", 0) + sizes.get("responseHeadersSize", 0)
+        if self._would_block.pop(request, None) is not None:
+            self.stats.would_block_bytes += transferred
+        else:
+            self.stats.allowed_bytes += transferred
+
+    def log_stats(self):
+        self.logger.info(f"Request routing: {self.stats.as_dict()}")
@@ -1,7 +1,9 @@
 import asyncio
 import logging
 from .race import BetfairRace
+from .listing import LISTING_LINKS_JS, SITE_URL, extract_event_id, parse_listing_entry
 from utils.logger import setup_logger
+from utils.concurrency import iter_sliding_window, sliding_window
 from bs4 import BeautifulSoup
 
 class BetfairScraper:
@@ -14,84 +16,111 @@ class BetfairScraper:
         self.logger = setup_logger("BetfairScraper")
 
     async def get_race_urls(self, tommorow=False):
+        return [entry["url"] for entry in await self.get_race_listings(tommorow)]
+
+    async def get_race_listings(self, tommorow=False):
+        """Return {"url", "metadata"} for every listed race; metadata is None if the
+        listing didn't show enough to build it."""
         self.logger.info("Fetching available Betfair race URLs")
-        all_race_links = []
+        # Horse and greyhound listings load side by side
+        listings = await asyncio.gather(*(
+            self._get_listing_entries(race_type, base_url, tommorow)
+            for race_type, base_url in self.base_urls.items()
+        ))
+        all_race_links = [entry for entries in listings for entry in entries]
 
-        for race_type, base_url in self.base_urls.items():
-            page = await self.context.new_page()
-            await page.goto(base_url, timeout=60000)
+        self.logger.info(f"Found {len(all_race_links)} total races.")
+        return all_race_links
 
-            if tommorow:
-                tomorrow_button = page.locator("button.schedule-filter-button", has_text="Tomorrow")
-                await tomorrow_button.wait_for(state="visible", timeout=10000)
-                await tomorrow_button.click(force=True)
-                self.logger.info(f"Betfair: we are getting {race_type} race data for tomorrow.")
-                await page.wait_for_timeout(3000)
+    async def get_race_metadata(self, tommorow=False):
+        """Metadata for every listed race, opening race pages only for listings that couldn't be parsed."""
+        return [metadata async for metadata in self.iter_race_metadata(tommorow)]
 
-            await page.wait_for_selector(".race-link", timeout=20000)
+    async def iter_race_metadata(self, tommorow=False):
+        """Yield race metadata as soon as each record is available.
 
-            race_links_elements = await page.query_selector_all(".race-link")
-            race_links = [
-                "https://www.betfair.com.au/exchange/plus/" + await el.get_attribute("href")
-                for el in race_links_elements
-            ]
+        Races parsed from listings come out first, then race-page fallbacks in the
+        order they finish.
+        """
+        listings = await self.get_race_listings(tommorow)
+        fallback_urls = []
+        for entry in listings:
+            if entry["metadata"]:
+                yield entry["metadata"]
+            else:
+                fallback_urls.append(entry["url"])
+        self.logger.info(f"Parsed {len(listings) - len(fallback_urls)} races from listings, {len(fallback_urls)} need their race page")
 
-            buttons = page.locator(".country-tab")
-            count = await buttons.count()
+        async for metadata in self.iter_race_metadata_batch(fallback_urls):
+            yield metadata
 
-            popup_close_btn = await page.query_selector(
-                ".tw-rounded-full.tw-cursor-pointer.tw-bg-black.tw-top-6.tw-right-6"
-            )
+    async def _get_listing_entries(self, race_type, base_url, tommorow=False):
+        page = await self.context.new_page()
+        await page.goto(base_url, timeout=60000)
 
-            if popup_close_btn:
-                await popup_close_btn.click()
-                await page.wait_for_timeout(500) 
-            else:
-                self.logger.info(f"Warning: No popup detected on betfair {race_type} racing - we may not get non Australian race urls.")
-
-            '''
-            for i in range(count):
-                await buttons.nth(i).click(force=True)
-                await page.wait_for_timeout(1000)
-                await page.wait_for_selector(".race-link", timeout=20000)
-                race_links_elements = await page.query_selector_all(".race-link")
-                race_links += [
-                "https://www.betfair.com.au/exchange/plus/" + await el.get_attribute("href")
-                for el in race_links_elements] 
-            ''' # this will require some new matching logic - not only for the regex, but also match_races, as we can not get the race number for certain uk races.
-            await page.close()
-            self.logger.info(f"Found {len(race_links)} {race_type} races.")
-            all_race_links.extend(race_links)
+        if tommorow:
+            tomorrow_button = page.locator("button.schedule-filter-button", has_text="Tomorrow")
+            await tomorrow_button.wait_for(state="visible", timeout=10000)
+            await tomorrow_button.click(force=True)
+            self.logger.info(f"Betfair: we are getting {race_type} race data for tomorrow.")
+            await page.wait_for_timeout(3000)
 
-        self.logger.info(f"Found {len(all_race_links)} total races.")
-        return all_race_links
+        await page.wait_for_selector(".race-link", timeout=20000)
+
+        links = await page.eval_on_selector_all(".race-link", LISTING_LINKS_JS)
+        race_links = [
+            {"url": SITE_URL + link["href"], "metadata": parse_listing_entry(race_type, link)}
+            for link in links if link["href"]
+        ]
+
+        buttons = page.locator(".country-tab")
+        count = await buttons.count()
+
+        popup_close_btn = await page.query_selector(
+            ".tw-rounded-full.tw-cursor-pointer.tw-bg-black.tw-top-6.tw-right-6"
+        )
+
+        if popup_close_btn:
+            await popup_close_btn.click()
+            await page.wait_for_timeout(500) 
+        else:
+            self.logger.info(f"Warning: No popup detected on betfair {race_type} racing - we may not get non Australian race urls.")
+
+        '''
+        for i in range(count):
+            await buttons.nth(i).click(force=True)
+            await page.wait_for_timeout(1000)
+            await page.wait_for_selector(".race-link", timeout=20000)
+            race_links_elements = await page.query_selector_all(".race-link")
+            race_links += [
+            "https://www.betfair.com.au/exchange/plus/" + await el.get_attribute("href")
+            for el in race_links_elements] 
+        ''' # this will require some new matching logic - not only for the regex, but also match_races, as we can not get the race number for certain uk races.
+        await page.close()
+        self.logger.info(f"Found {len(race_links)} {race_type} races.")
+        return race_links
+
+    def extract_event_id(self, url):
+        return extract_event_id(url)
 
     async def get_race_objects(self, urls):
         return [BetfairRace(url, self.context) for url in urls]
 
-    async def get_race_metadata_batch(self, urls, batch_size=10):
-        self.logger.info("Starting batch processing of race metadata")
+    async def _fetch_metadata(self, race):
+        try:
+            return await race.fetch_metadata()
+        finally:
+            # Free the page as soon as this race is done, not when its batch is
+            if race.page:
+                await race.cleanup()
+
+    async def iter_race_metadata_batch(self, urls, concurrency=10):
+        """Like get_race_metadata_batch, but yields each race as soon as its page is read."""
+        races = await self.get_race_objects(urls)
+        async for metadata in iter_sliding_window(races, self._fetch_metadata, limit=concurrency):
+            yield metadata
+
+    async def get_race_metadata_batch(self, urls, concurrency=10):
+        self.logger.info(f"Fetching race metadata for {len(urls)} races, {concurrency} at a time")
         races = await self.get_race_objects(urls)
-        results = []
-        
-        for i in range(0, len(races), batch_size):
-            batch = races[i:i + batch_size]
-            self.logger.info(f"Processing races {i+1} to {i+len(batch)}")
-            
-            try:
-                # Gather metadata for all races in batch
-                infos = await asyncio.gather(*(race.fetch_metadata() for race in batch))
-                results.extend(infos)
-            except Exception as e:
-                self.logger.error(f"Error processing batch {i+1} to {i+len(batch)}: {e}")
-                raise
-            finally:
-                # Ensure cleanup happens for each race in the batch
-                cleanup_tasks = []
-                for race in batch:
-                    if race.page:  # Only cleanup if page exists
-                        cleanup_tasks.append(race.cleanup())
-                if cleanup_tasks:
-                    await asyncio.gather(*cleanup_tasks, return_exceptions=True)
-                
-        return results
\ No newline at end of file
+        return await sliding_window(races, self._fetch_metadata, limit=concurrency)
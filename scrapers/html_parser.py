@@ -0,0 +1,97 @@
+from collections import namedtuple
+
+# Tags/classes to keep in a partial parse. Only matching elements (and everything
+# inside them) are built, the rest of the document is skipped.
+Partial = namedtuple("Partial", ["tags", "classes"])
+
+PARSER_BACKENDS = ("html.parser", "lxml", "selectolax")
+DEFAULT_PARSER = "html.parser"
+
+
+class _SoupNode:
+    __slots__ = ("_el",)
+
+    def __init__(self, el):
+        self._el = el
+
+    def select(self, css):
+        return [_SoupNode(el) for el in self._el.select(css)]
+
+    def select_one(self, css):
+        el = self._el.select_one(css)
+        return _SoupNode(el) if el is not None else None
+
+    def text(self):
+        return self._el.get_text().strip()
+
+    def attr(self, name):
+        value = self._el.get(name)
+        # bs4 splits multi-valued attributes like class into lists
+        return " ".join(value) if isinstance(value, list) else value
+
+
+class _LexborNode:
+    __slots__ = ("_el",)
+
+    def __init__(self, el):
+        self._el = el
+
+    def select(self, css):
+        return [_LexborNode(el) for el in self._el.css(css)]
+
+    def select_one(self, css):
+        el = self._el.css_first(css)
+        return _LexborNode(el) if el is not None else None
+
+    def text(self):
+        return self._el.text().strip()
+
+    def attr(self, name):
+        return self._el.attributes.get(name)
+
+
+class SoupParser:
+    """BeautifulSoup with a pluggable tree builder ("html.parser" or "lxml")."""
+
+    def __init__(self, features="html.parser"):
+        from bs4 import BeautifulSoup, SoupStrainer
+        if features == "lxml":
+            import lxml  # noqa: F401 - fail here rather than on the first page
+        self.name = features
+        self._soup = BeautifulSoup
+        self._strainer = SoupStrainer
+
+    def parse(self, html, only=None):
+        parse_only = None
+        if only is not None:
+            attrs = {"class": list(only.classes)} if only.classes else {}
+            parse_only = self._strainer(list(only.tags) or None, attrs=attrs)
+        return _SoupNode(self._soup(html, self.name, parse_only=parse_only))
+
+
+class SelectolaxParser:
+    """selectolax (lexbor) parser. Parsing the whole document is already cheaper than a
+    strained BeautifulSoup parse, so partial specs are accepted and ignored."""
+
+    def __init__(self):
+        try:
+            from selectolax.lexbor import LexborHTMLParser as HTMLParser
+        except ImportError:
+            from selectolax.parser import HTMLParser
+        self.name = "selectolax"
+        self._parser = HTMLParser
+
+    def parse(self, html, only=None):
+        return _LexborNode(self._parser(html))
+
+
+_parsers = {}
+
+
+def get_parser(name=DEFAULT_PARSER):
+    """Return a (cached) parser backend by name."""
+    if name not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser backend: {name}. Choose from {PARSER_BACKENDS}")
+    if name not in _parsers:
+        _parsers[name] = SelectolaxParser() if name == "selectolax" else SoupParser(name)
+    return _parsers[name]
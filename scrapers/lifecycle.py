@@ -0,0 +1,160 @@
+import asyncio
+import bisect
+import itertools
+from datetime import datetime, timedelta
+from scrapers.betfair.race import BetfairRace
+from scrapers.sportsbet.race import SportsbetRace
+from data.odds_events import race_removed
+from data.odds_store import make_odds_key
+from data.runners import RunnerIdentity
+from scrapers.recorder import PayloadRecorder, recording_path
+from utils.logger import setup_logger
+from utils.match_races import get_race_datetime
+
+# Betfair market states that mean prices are no longer worth following
+FINISHED_STATUSES = ("CLOSED",)
+SUSPENDED_STATUSES = ("SUSPENDED",)
+
+
+class RaceLifecycleManager:
+    """Opens race pages as races come into range and retires them once they're run.
+
+    Every matched race is queued up front, but a race only gets its Sportsbet and
+    Betfair pages when its jump is within ``lookahead``, and never more than
+    ``max_live`` races at once (earliest jump first). A race is retired once it is
+    ``retire_after`` past its jump time, or when Betfair reports the market closed -
+    or suspended inside the last ``suspend_window`` before the jump, since markets
+    are also briefly suspended earlier to process scratchings. Only network-mode
+    Betfair races see the market status; in DOM mode races retire on time alone.
+
+    With ``record_dir`` set, every raw payload each race's pages read is logged
+    there for offline replay (see scrapers.replay).
+    """
+
+    def __init__(self, context, scheduler, lookahead=timedelta(minutes=30), max_live=20,
+                 retire_after=timedelta(minutes=2), suspend_window=timedelta(minutes=5),
+                 check_interval=10, sportsbet_options=None, betfair_options=None, events=None,
+                 record_dir=None):
+        self.context = context
+        self.scheduler = scheduler
+        self.logger = setup_logger("RaceLifecycle")
+        self.events = events  # optional asyncio.Queue the races publish OddsChange onto
+        self.lookahead = lookahead
+        self.max_live = max_live
+        self.retire_after = retire_after
+        self.suspend_window = suspend_window
+        self.check_interval = check_interval
+        self.sportsbet_options = sportsbet_options or {}
+        self.betfair_options = betfair_options or {}
+        if self.betfair_options.get("mode", "dom") != "network":
+            self.logger.warning("Betfair races aren't in network mode, so races only retire after their jump time")
+        self.record_dir = record_dir
+        self.recorders = {}  # race_key -> PayloadRecorder, while recording
+
+        self.pending = []   # sorted (race_time, seq, race_key, match) not yet opened
+        self.live = {}      # race_key -> (match, sb, bf)
+        self.retired = set()
+        self._known = set()
+        self._counter = itertools.count()
+
+    def add(self, match):
+        """Queue a matched race. A race still pending is requeued with the new details
+        (e.g. a changed jump time); races already live or retired are ignored."""
+        race_key = make_odds_key(match)
+        if race_key in self._known and not self.discard(race_key):
+            return
+        self._known.add(race_key)
+        bisect.insort(self.pending, (get_race_datetime(match), next(self._counter), race_key, match))
+
+    def discard(self, race_key):
+        """Forget a race that hasn't been opened yet. Returns True if it was pending."""
+        for i, (_, _, pending_key, _) in enumerate(self.pending):
+            if pending_key == race_key:
+                del self.pending[i]
+                self._known.discard(race_key)
+                return True
+        return False
+
+    def _is_finished(self, race_key):
+        match, sb, bf = self.live[race_key]
+        race_time = get_race_datetime(match)
+        now = datetime.now()
+        if race_time != datetime.max and now > race_time + self.retire_after:
+            return True
+        if bf.market_status in FINISHED_STATUSES:
+            return True
+        if bf.market_status in SUSPENDED_STATUSES and race_time != datetime.max:
+            return now >= race_time - self.suspend_window
+        return False
+
+    async def _open(self, race_key, race_time, match):
+        # Both pages resolve their runners against the same identity map
+        runners = RunnerIdentity()
+        recorder = None
+        if self.record_dir:
+            recorder = self.recorders[race_key] = PayloadRecorder(recording_path(race_key, self.record_dir))
+        sb = SportsbetRace(match['sportsbet']['url'], self.context, race_key=race_key, events=self.events,
+                           runners=runners, recorder=recorder, **self.sportsbet_options)
+        bf = BetfairRace(match['betfair']['url'], self.context, race_key=race_key, events=self.events,
+                         runners=runners, recorder=recorder, **self.betfair_options)
+        self.live[race_key] = (match, sb, bf)
+        try:
+            await asyncio.gather(sb.initialize(), bf.initialize())
+        except Exception as e:
+            self.logger.error(f"Failed to open {race_key}, will retry: {e}")
+            await self._close(race_key)
+            # Give it another go on a later check, as long as it hasn't jumped
+            self._known.discard(race_key)
+            self.add(match)
+            return
+        self.scheduler.add(sb, race_time)
+        self.scheduler.add(bf, race_time)
+        self.logger.info(f"Opened {race_key} ({len(self.live)} live, {len(self.pending)} pending)")
+
+    async def _close(self, race_key):
+        match, sb, bf = self.live.pop(race_key)
+        self.scheduler.remove(sb)
+        self.scheduler.remove(bf)
+        await asyncio.gather(sb.close(), bf.close(), return_exceptions=True)
+        recorder = self.recorders.pop(race_key, None)
+        if recorder:
+            recorder.close()
+        if self.events is not None:
+            self.events.put_nowait(race_removed(race_key))
+
+    async def _retire_finished(self):
+        for race_key in [key for key in self.live if self._is_finished(key)]:
+            await self._close(race_key)
+            self.retired.add(race_key)
+            self.logger.info(f"Retired {race_key} ({len(self.live)} live)")
+
+    async def _open_due(self):
+        now = datetime.now()
+        to_open = []
+        while self.pending and len(self.live) + len(to_open) < self.max_live:
+            race_time, _, race_key, match = self.pending[0]
+            if race_time != datetime.max and race_time + self.retire_after < now:
+                # Jumped before we ever got to it
+                self.pending.pop(0)
+                self.retired.add(race_key)
+                continue
+            if race_time - now > self.lookahead:
+                break
+            self.pending.pop(0)
+            to_open.append(self._open(race_key, race_time, match))
+        if to_open:
+            await asyncio.gather(*to_open)
+
+    async def run(self):
+        """Open and retire races until cancelled."""
+        try:
+            while True:
+                await self._retire_finished()
+                await self._open_due()
+                await asyncio.sleep(self.check_interval)
+        finally:
+            await self.close_all()
+
+    async def close_all(self):
+        for race_key in list(self.live):
+            await self._close(race_key)
@@ -0,0 +1,100 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from scrapers.html_parser import DEFAULT_PARSER, get_parser
+from scrapers.betfair.ladder import parse_ladder
+from scrapers.sportsbet.extract import parse_outcome_page
+from utils.logger import setup_logger
+
+logger = setup_logger("ParsePool")
+
+# site -> parse(html, parser) returning the name-keyed latest_odds for one page
+PAGE_PARSERS = {
+    "betfair": parse_ladder,
+    "sportsbet": parse_outcome_page,
+}
+
+
+def parse_page(site, html, parser_name=DEFAULT_PARSER):
+    """Worker entry point: parse one page's HTML (str or UTF-8 bytes) into latest_odds."""
+    if isinstance(html, bytes):
+        html = html.decode("utf-8", errors="replace")
+    return PAGE_PARSERS[site](html, get_parser(parser_name))
+
+
+class ParsePool:
+    """Parses race pages in worker processes, so parsing never blocks the event loop.
+
+    At most ``max_in_flight`` pages (one per worker by default) are being parsed at
+    once; the rest wait here, one per race, where they can still be dropped. A
+    newer page for a race replaces the one it has waiting, and pages that have
+    waited longer than ``max_age`` seconds are dropped rather than parsed late.
+    Dropped pages resolve to None.
+    """
+
+    def __init__(self, workers=None, max_in_flight=None, max_age=5.0):
+        workers = workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        self.max_in_flight = max_in_flight or workers
+        self.max_age = max_age
+        self.dropped = 0
+        self._running = set()         # keys with a page in a worker
+        self._waiting = OrderedDict()  # key -> (queued_at, site, html, parser_name, future)
+
+    async def parse(self, key, site, html, parser_name=DEFAULT_PARSER):
+        """Parse ``html`` for the race identified by ``key``; None if it went stale."""
+        future = asyncio.get_running_loop().create_future()
+        stale = self._waiting.pop(key, None)
+        if stale:
+            self._drop(stale)
+        self._waiting[key] = (time.monotonic(), site, html, parser_name, future)
+        self._pump()
+        return await future
+
+    def _drop(self, waiting):
+        future = waiting[-1]
+        if not future.done():
+            future.set_result(None)
+        self.dropped += 1
+
+    def _pump(self):
+        loop = asyncio.get_running_loop()
+        now = time.monotonic()
+        for key in list(self._waiting):
+            if len(self._running) >= self.max_in_flight:
+                break
+            queued_at, site, html, parser_name, future = self._waiting[key]
+            if future.done():
+                # The caller gave up (e.g. its refresh was cancelled)
+                del self._waiting[key]
+                continue
+            if now - queued_at > self.max_age:
+                self._drop(self._waiting.pop(key))
+                continue
+            if key in self._running:
+                continue
+            del self._waiting[key]
+            self._running.add(key)
+            task = loop.run_in_executor(self.executor, parse_page, site, html, parser_name)
+            task.add_done_callback(lambda task, key=key, future=future: self._done(key, future, task))
+
+    def _done(self, key, future, task):
+        self._running.discard(key)
+        if not future.done():
+            if task.cancelled():
+                future.cancel()
+            elif task.exception() is not None:
+                future.set_exception(task.exception())
+            else:
+                future.set_result(task.result())
+        self._pump()
+
+    def shutdown(self):
+        for waiting in self._waiting.values():
+            self._drop(waiting)
+        self._waiting.clear()
+        if self.dropped:
+            logger.info(f"Dropped {self.dropped} stale pages")
+        self.executor.shutdown(wait=False, cancel_futures=True)
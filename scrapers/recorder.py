@@ -0,0 +1,67 @@
+import gzip
+import json
+import os
+import time
+
+RECORDINGS_DIR = "recordings"
+
+
+def recording_path(race_key, directory=RECORDINGS_DIR):
+    """The log file a race's raw payloads are recorded to."""
+    safe_key = "".join(c if c.isalnum() or c in "-_" else "_" for c in race_key)
+    return os.path.join(directory, f"{safe_key}.jsonl.gz")
+
+
+class PayloadRecorder:
+    """Append-only gzip log of one race's raw scraper payloads.
+
+    Every line is a JSON record {"t": epoch seconds, "source": bookmaker,
+    "kind": payload kind, "payload": ...}. Each bookmaker page opens with a
+    "start" record holding its URL. The file is flushed every ``flush_every``
+    records, so a crash loses at most that many; reopening the same file appends
+    a new gzip member, which reads back as one stream.
+    """
+
+    def __init__(self, path, flush_every=20):
+        self.path = path
+        self.flush_every = flush_every
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = gzip.open(path, "at", encoding="utf-8")
+        self._pending = 0
+
+    def start(self, source, url):
+        self.record(source, "start", url)
+
+    def record(self, source, kind, payload, timestamp=None):
+        if self._file is None:
+            return
+        line = json.dumps({"t": timestamp or time.time(), "source": source, "kind": kind, "payload": payload},
+                          separators=(",", ":"))
+        self._file.write(line + "\n")
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self._file.flush()
+            self._pending = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_records(path):
+    """Yield the records of one recording in the order they were written.
+
+    A truncated tail (the recorder was killed mid-write) ends the log early
+    rather than raising.
+    """
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    return
+        except (EOFError, gzip.BadGzipFile):
+            return
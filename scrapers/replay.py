@@ -0,0 +1,135 @@
+"""Feed recorded scraper payloads back through the parsers and the odds merge.
+
+No browser is involved: each recording's "start" records create the same
+SportsbetRace/BetfairRace objects the coordinator uses (with no page), and every
+payload goes through their ``ingest`` exactly as it did live. Recordings are
+replayed together in timestamp order, as fast as possible or paced at
+``--speed`` times real time.
+
+Usage:
+    python -m scrapers.replay recordings/*.jsonl.gz [--speed 1] [--parser lxml] [--show-changes]
+"""
+import argparse
+import heapq
+import os
+import queue
+import time
+from collections import Counter
+from data.odds_store import OddsStore
+from data.price_history import PriceHistory
+from data.runners import RunnerIdentity
+from scrapers.betfair.race import BetfairRace
+from scrapers.html_parser import DEFAULT_PARSER, PARSER_BACKENDS
+from scrapers.recorder import read_records
+from scrapers.sportsbet.race import SportsbetRace
+
+RACE_CLASSES = {
+    "sportsbet": SportsbetRace,
+    "betfair": BetfairRace,
+}
+
+
+def race_key_for(path):
+    """Recordings are named after their race key (see recorder.recording_path)."""
+    return os.path.basename(path).split(".", 1)[0]
+
+
+def iter_recordings(paths):
+    """Yield (race_key, record) from every recording, merged in timestamp order."""
+    streams = [((race_key_for(path), record) for record in read_records(path)) for path in paths]
+    return heapq.merge(*streams, key=lambda item: item[1]["t"])
+
+
+class ReplayStats:
+    def __init__(self):
+        self.records = Counter()        # (source, kind) -> payloads ingested
+        self.parse_seconds = Counter()  # (source, kind) -> time spent in ingest
+        self.changes = 0
+        self.merge_seconds = 0.0
+        self.wall_seconds = 0.0
+
+    def report(self):
+        lines = [f"{'payload':<24}{'count':>8}{'ms/payload':>12}{'payloads/s':>12}"]
+        for (source, kind), count in sorted(self.records.items()):
+            seconds = self.parse_seconds[(source, kind)]
+            rate = count / seconds if seconds else float("inf")
+            lines.append(f"{source + ' ' + kind:<24}{count:>8}{seconds / count * 1000:>12.3f}{rate:>12.0f}")
+        lines.append(f"{self.changes} odds changes merged in {self.merge_seconds:.3f}s, "
+                     f"{self.wall_seconds:.2f}s wall time")
+        return "\n".join(lines)
+
+
+def replay(paths, store=None, history=None, speed=None, parser=DEFAULT_PARSER, on_changes=None):
+    """Replay recordings into ``store`` (a fresh OddsStore by default).
+
+    ``speed`` None replays as fast as possible; otherwise payloads are spaced out
+    at ``speed`` times the recorded pace. ``on_changes(record, changes)`` is called
+    after each payload is merged. Returns (store, ReplayStats).
+    """
+    store = store if store is not None else OddsStore()
+    history = history if history is not None else PriceHistory()
+    events = queue.SimpleQueue()
+    races = {}    # (race_key, source) -> race object
+    runners = {}  # race_key -> RunnerIdentity shared by the race's bookmakers
+    stats = ReplayStats()
+
+    start = time.perf_counter()
+    first_t = None
+    for race_key, record in iter_recordings(paths):
+        source, kind, payload = record["source"], record["kind"], record["payload"]
+        if kind == "start":
+            identity = runners.setdefault(race_key, RunnerIdentity())
+            races[(race_key, source)] = RACE_CLASSES[source](payload, None, parser=parser, race_key=race_key,
+                                                             events=events, runners=identity)
+            continue
+        race = races.get((race_key, source))
+        if race is None:
+            continue
+
+        if speed:
+            first_t = record["t"] if first_t is None else first_t
+            delay = (record["t"] - first_t) / speed - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+
+        parse_start = time.perf_counter()
+        race.ingest(kind, payload)
+        stats.parse_seconds[(source, kind)] += time.perf_counter() - parse_start
+        stats.records[(source, kind)] += 1
+
+        changes = []
+        while not events.empty():
+            changes.append(events.get_nowait())
+        merge_start = time.perf_counter()
+        store.apply(changes)
+        history.record_many(changes)
+        stats.merge_seconds += time.perf_counter() - merge_start
+        stats.changes += len(changes)
+        if on_changes:
+            on_changes(record, changes)
+
+    stats.wall_seconds = time.perf_counter() - start
+    return store, stats
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    arg_parser.add_argument("recordings", nargs="+")
+    arg_parser.add_argument("--speed", type=float, default=None, help="pace relative to real time (default: max)")
+    arg_parser.add_argument("--parser", choices=PARSER_BACKENDS, default=DEFAULT_PARSER)
+    arg_parser.add_argument("--show-changes", action="store_true", help="print every merged change")
+    args = arg_parser.parse_args()
+
+    def show(record, changes):
+        for change in changes:
+            print(f"{record['t']:.3f} {change.race_key} {change.source} #{change.runner} "
+                  f"{change.field}: {change.old!r} -> {change.new!r}")
+
+    store, stats = replay(args.recordings, speed=args.speed, parser=args.parser,
+                          on_changes=show if args.show_changes else None)
+    print(stats.report())
+    print(f"Final store version {store.version}, {len(store.snapshot().races)} races")
+
+
+if __name__ == "__main__":
+    main()
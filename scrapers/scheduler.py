@@ -0,0 +1,135 @@
+import asyncio
+import heapq
+import itertools
+from datetime import datetime
+from utils.logger import setup_logger
+
+# (seconds to jump, poll interval) - the first tier the race falls within wins
+DEFAULT_POLL_TIERS = (
+    (60, 0.5),         # final minute: twice a second
+    (5 * 60, 1),
+    (15 * 60, 2),
+    (60 * 60, 5),
+    (3 * 60 * 60, 15),
+)
+FAR_INTERVAL = 60      # anything further out than the last tier
+OFF_GRACE = 60         # keep polling this long after the advertised jump time
+
+
+def poll_interval(seconds_to_jump, tiers=DEFAULT_POLL_TIERS, far_interval=FAR_INTERVAL, off_grace=OFF_GRACE):
+    """Return the poll interval for a race, or None once the race is off."""
+    if seconds_to_jump is None:
+        return far_interval
+    if seconds_to_jump < -off_grace:
+        return None
+    for threshold, interval in tiers:
+        if seconds_to_jump <= threshold:
+            return interval
+    return far_interval
+
+
+class PollScheduler:
+    """Owns the refreshes of every race and paces each one by its time to jump.
+
+    Races only need an async ``refresh()`` that fetches one update. A race is never
+    refreshed twice at once: its next poll is scheduled when the current one finishes.
+    """
+
+    def __init__(self, max_concurrent=20, tiers=DEFAULT_POLL_TIERS, far_interval=FAR_INTERVAL, off_grace=OFF_GRACE):
+        self.tiers = tiers
+        self.far_interval = far_interval
+        self.off_grace = off_grace
+        self.logger = setup_logger("PollScheduler")
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._heap = []
+        self._race_times = {}  # race -> jump datetime (or None if unknown)
+        self._active = set()   # races with a queued or in-flight refresh
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._tasks = set()
+
+    def __len__(self):
+        return len(self._race_times)
+
+    def add(self, race, race_time=None):
+        """Start polling a race; it gets its first refresh straight away."""
+        if race in self._race_times:
+            return
+        self._race_times[race] = race_time
+        # A race removed and re-added while its last refresh is in flight keeps that chain
+        if race not in self._active:
+            self._active.add(race)
+            self._push(race, 0)
+
+    def remove(self, race):
+        """Stop polling a race. Any refresh already in flight is allowed to finish."""
+        self._race_times.pop(race, None)
+
+    def interval_for(self, race):
+        race_time = self._race_times.get(race)
+        if race_time is None or race_time == datetime.max:
+            return poll_interval(None, self.tiers, self.far_interval, self.off_grace)
+        seconds_to_jump = (race_time - datetime.now()).total_seconds()
+        return poll_interval(seconds_to_jump, self.tiers, self.far_interval, self.off_grace)
+
+    def _push(self, race, delay):
+        loop = asyncio.get_running_loop()
+        heapq.heappush(self._heap, (loop.time() + delay, next(self._counter), race))
+        self._wakeup.set()
+
+    async def _refresh(self, race):
+        async with self._semaphore:
+            try:
+                await race.refresh()
+            except Exception as e:
+                self.logger.error(f"Error refreshing {getattr(race, 'url', race)}: {e}")
+
+        if race not in self._race_times:
+            self._active.discard(race)
+            return
+        interval = self.interval_for(race)
+        if interval is None:
+            self.logger.info(f"Race is off, stopped polling {getattr(race, 'url', race)}")
+            self.remove(race)
+            self._active.discard(race)
+            return
+        self._push(race, interval)
+
+    async def run(self, stop_when_idle=False):
+        """Drive refreshes until cancelled (or until no races are left)."""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                if not self._heap:
+                    if stop_when_idle and not self._tasks and not self._race_times:
+                        return
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+
+                due, _, race = self._heap[0]
+                delay = due - loop.time()
+                if delay > 0:
+                    # Sleep until the next race is due, or until an earlier one is added
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                heapq.heappop(self._heap)
+                if race not in self._race_times:
+                    self._active.discard(race)
+                    continue
+                task = asyncio.create_task(self._refresh(race))
+                self._tasks.add(task)
+                task.add_done_callback(self._on_task_done)
+        finally:
+            for task in self._tasks:
+                task.cancel()
+
+    def _on_task_done(self, task):
+        self._tasks.discard(task)
+        # Lets an idle run(stop_when_idle=True) notice the last refresh finished
+        self._wakeup.set()
@@ -0,0 +1,126 @@
+from data.runner_odds import RunnerOdds
+from data.runners import clean_runner_name, normalize_runner_name
+from scrapers.html_parser import Partial
+
+# Runs inside the live page and returns one compact row per outcome card:
+# [number, name, win price, open price, [flucs...]]
+EXTRACT_ROWS_JS = """
+() => Array.from(document.querySelectorAll("div.outcomeCard_f7jc198")).map(card => {
+    const nameTag = card.querySelector("div.outcomeName_f18x6kvm");
+    if (!nameTag) return null;
+    const parts = nameTag.textContent.trim().split(". ");
+    const number = parts.length > 1 ? parts[0] : "";
+    const name = parts.length > 1 ? parts[1] : parts[0];
+    const flucs = Array.from(
+        card.querySelectorAll("span.priceFlucsTextDesktop_fiml4cj"),
+        el => el.textContent.trim()
+    );
+    const price = card.querySelector("div.priceText_f71sibe");
+    return [number, name, price ? price.textContent.trim() : null, flucs[0] ?? null, flucs.slice(1)];
+}).filter(Boolean)
+"""
+
+# Installs a MutationObserver that pushes fresh rows through an exposed binding
+# whenever any outcome card changes. Bursts of mutations are coalesced.
+OBSERVE_ROWS_JS = """
+([bindingName, debounceMs]) => {
+    if (window.__sbOddsObserver) window.__sbOddsObserver.disconnect();
+    const extract = """ + EXTRACT_ROWS_JS.strip() + """;
+    let pending = null;
+    const push = () => { pending = null; window[bindingName](extract()); };
+    const target = document.querySelector("div.outcomeCard_f7jc198")?.parentElement || document.body;
+    window.__sbOddsObserver = new MutationObserver(() => {
+        if (pending === null) pending = setTimeout(push, debounceMs);
+    });
+    window.__sbOddsObserver.observe(target, { subtree: true, childList: true, characterData: true });
+    push();
+}
+"""
+
+
+def runner_entry(number, name, win_fixed, open_odds, flucs):
+    """Build a latest_odds entry from a compact outcome row.
+
+    Returns (dict_key, entry). The win price is NaN when missing; the fluctuations
+    keep their scraped text, with "N/A" for missing ones.
+    """
+    win_fixed = win_fixed or "N/A"
+    open_odds = open_odds or "N/A"
+    fluc1_odds = flucs[0] if len(flucs) > 0 else "N/A"
+    fluc2_odds = flucs[1] if len(flucs) > 1 else "N/A"
+
+    display_name = clean_runner_name(name)
+    dict_key = normalize_runner_name(display_name)
+
+    return dict_key, RunnerOdds(display_name, number.strip(), {"1st_back": win_fixed}, {
+        "open": open_odds,
+        "open_decimal": float(open_odds) if open_odds != "N/A" else None,
+        "fluctuation1": fluc1_odds,
+        "fluctuation2": fluc2_odds,
+    })
+
+
+# Partial-parse specs: the outcome cards for odds, the header for metadata
+OUTCOME_CARDS = Partial(tags=("div",), classes=("outcomeCard_f7jc198",))
+RACE_HEADER = Partial(tags=("h1", "span"), classes=())
+
+
+def parse_outcome_rows(html, parser):
+    """Parse the outcome cards of a race page into compact rows, like EXTRACT_ROWS_JS."""
+    root = parser.parse(html, only=OUTCOME_CARDS)
+
+    rows = []
+    # Loop through each outcome card and extract odds
+    for outcome in root.select("div.outcomeCard_f7jc198"):
+        name_tag = outcome.select_one("div.outcomeName_f18x6kvm")
+        if not name_tag:
+            continue
+
+        name_parts = name_tag.text().split(". ")
+        number = name_parts[0] if len(name_parts) > 1 else ""
+        name = name_parts[1] if len(name_parts) > 1 else name_parts[0]
+
+        # Extract odds information
+        odds_tags = [tag.text() for tag in outcome.select("span.priceFlucsTextDesktop_fiml4cj")]
+        price_button = outcome.select_one("div.priceText_f71sibe")
+        win_fixed = price_button.text() if price_button else None
+        rows.append((number, name, win_fixed, odds_tags[0] if odds_tags else None, odds_tags[1:]))
+
+    return rows
+
+
+def rows_to_horse_data(rows, logger=None):
+    """Convert compact (number, name, win, open, flucs) rows into latest_odds.
+
+    A row that can't be converted is skipped (and logged, given a logger).
+    """
+    horse_data = {}
+    for number, name, win_fixed, open_odds, flucs in rows:
+        try:
+            dict_key, entry = runner_entry(number, name, win_fixed, open_odds, flucs)
+            horse_data[dict_key] = entry
+        except Exception as e:
+            if logger:
+                logger.error(f"Error processing outcome: {e}")
+    return horse_data
+
+
+def parse_outcome_page(html, parser):
+    """Parse a race page straight into latest_odds."""
+    return rows_to_horse_data(parse_outcome_rows(html, parser))
+
+
+def parse_race_header(html, parser):
+    """Return (race_name, race_time) text from a race page; either may be None."""
+    root = parser.parse(html, only=RACE_HEADER)
+
+    race_name = None
+    for h1 in root.select("h1"):
+        css_class = h1.attr("class")
+        if css_class and "title" in css_class.lower():
+            race_name = h1.text()
+            break
+
+    time_element = root.select_one("span.size14_f7opyze.defaultTimer_f17adqu9, span.size16_f6irgbz")
+    race_time = time_element.text() if time_element else None
+    return race_name, race_time
@@ -0,0 +1,69 @@
+import re
+
+SITE_URL = "https://www.sportsbet.com.au"
+
+# Every anchor on the schedule page as [href, text], in one round trip
+LISTING_ANCHORS_JS = "els => els.map(el => [el.getAttribute('href'), el.textContent.trim()])"
+
+RACE_HREF = re.compile(r"/(horse|greyhound)-racing/([^/]+)/([^/]+)/race-(\d+)-(\d+)")
+
+
+def extract_race_id(url):
+    """The race number in ".../race-<number>-<event id>", Sportsbet's race_id."""
+    match = re.search(r"race-(\d+)-", url or "")
+    return match.group(1) if match else "Unknown"
+
+
+def extract_event_id(url):
+    """The Sportsbet event id, the last number in ".../race-<number>-<event id>".
+
+    Unlike the race number it is unique per race, so caches key on it.
+    """
+    match = re.search(r"race-\d+-(\d+)", url or "")
+    return match.group(1) if match else "Unknown"
+
+
+def is_race_href(href):
+    return bool(href) and ("horse-racing/" in href or "greyhound-racing/" in href) and "race-" in href
+
+
+def parse_race_url(url):
+    """Race metadata carried by a race URL's slug, or None if it isn't a race URL.
+
+    Listings and race pages both take the venue from here, so a race gets the
+    same ``race_name`` whichever one it was read from.
+    """
+    match = RACE_HREF.search(url or "")
+    if not match:
+        return None
+    race_type, region, venue, race_number, _ = match.groups()
+    return {
+        "location": region.replace("-", " ").title(),
+        "race_name": venue.replace("-", " ").title(),
+        "race_number": race_number,
+        "race_type": race_type,
+    }
+
+
+def parse_listing_entry(href, text):
+    """Build race metadata from a schedule-page anchor, or None if it can't be parsed.
+
+    The URL slug carries the region, venue, race number and race type; the jump
+    time is only known if the anchor text shows one (e.g. "11:06").
+    """
+    slug = parse_race_url(href)
+    if not slug:
+        return None
+    url = f"{SITE_URL}{href}"
+
+    time_match = re.search(r"\b(\d{1,2}:\d{2})\b", text or "")
+
+    return {
+        "race_id": extract_race_id(url),
+        "location": slug["location"],
+        "race_name": slug["race_name"],
+        "race_number": slug["race_number"],
+        "race_time": time_match.group(1) if time_match else "Unknown Time",
+        "race_type": slug["race_type"],
+        "url": url,
+    }
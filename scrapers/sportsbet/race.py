@@ -1,20 +1,53 @@
 import re
-from bs4 import BeautifulSoup
 from utils.logger import setup_logger
+from data.odds_events import diff_odds
+from data.runners import RunnerIdentity
+from scrapers.scheduler import PollScheduler
+from scrapers.html_parser import DEFAULT_PARSER, get_parser
+from .listing import extract_race_id, parse_race_url
+from .extract import EXTRACT_ROWS_JS, OBSERVE_ROWS_JS, parse_outcome_rows, parse_race_header, rows_to_horse_data
 import asyncio
+import itertools
 
 class SportsbetRace:
-    def __init__(self, url: str, context):
+    # "reload" reloads and re-parses the whole page each tick, "evaluate" reads
+    # compact rows out of the live page with a single page.evaluate
+    MODES = ("reload", "evaluate")
+    PUSH_BINDING = "__sbOddsChanged"
+    # Bindings can't be removed, so pooled pages need a fresh name per initialize
+    _binding_ids = itertools.count()
+
+    def __init__(self, url: str, context, mode="reload", push=False, push_debounce_ms=100,
+                 parser=DEFAULT_PARSER, race_key=None, events=None, runners=None, recorder=None,
+                 parse_pool=None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown SportsbetRace mode: {mode}")
+        if push and mode != "evaluate":
+            raise ValueError("Push updates require mode='evaluate'")
         self.url = url
         self.context = context
+        self.mode = mode
+        self.push = push
+        self.push_debounce_ms = push_debounce_ms
+        self.parser = get_parser(parser)
         self.metadata = {}
         self.latest_odds = {}
+        self.race_key = race_key
+        self.events = events  # optional asyncio.Queue of OddsChange
+        # Shared with the other bookmaker's page for the same race, so both use the same runner ids
+        self.runners = runners if runners is not None else RunnerIdentity()
+        self.recorder = recorder  # optional PayloadRecorder for offline replay
+        self.parse_pool = parse_pool  # optional ParsePool, so page HTML is parsed off the event loop
+        if recorder:
+            recorder.start("sportsbet", url)
         self.logger = setup_logger("SportsbetRace")
         self.page = None
+        self.closed = False  # set by close(); a closed race never refreshes or publishes again
+        self._idle = asyncio.Event()  # clear while a refresh is in flight
+        self._idle.set()
 
     def extract_race_id(self, url):
-        match = re.search(r"race-(\d+)-", url)
-        return match.group(1) if match else "Unknown"
+        return extract_race_id(url)
 
     async def initialize(self):
         """Initialize the persistent page."""
@@ -22,12 +55,69 @@ class SportsbetRace:
             self.page = await self.context.new_page()
             await self.page.goto(self.url, timeout=60000)
             await self.page.wait_for_selector(".outcomeCard_f7jc198", timeout=10000)
+            if self.push:
+                binding = f"{self.PUSH_BINDING}_{next(self._binding_ids)}"
+                await self.page.expose_binding(binding, self._on_push)
+                await self.page.evaluate(OBSERVE_ROWS_JS, [binding, self.push_debounce_ms])
+
+    def _rows_to_horse_data(self, rows):
+        """Convert compact (number, name, win, open, flucs) rows into latest_odds."""
+        return rows_to_horse_data(rows, self.logger)
+
+    async def _on_push(self, source, rows):
+        """Receive rows pushed by the in-page MutationObserver."""
+        if rows:
+            self.ingest("rows", rows)
+
+    def ingest(self, kind, payload, parsed=None):
+        """Parse one raw payload into latest_odds, recording it first if recording.
+
+        ``kind`` is "rows" (compact rows read in the page) or "html" (the race page).
+        ``parsed`` is the payload already parsed elsewhere (e.g. by a ParsePool).
+        """
+        if self.closed:
+            return
+        if self.recorder:
+            self.recorder.record("sportsbet", kind, payload)
+        if parsed is None:
+            if kind == "html":
+                payload = parse_outcome_rows(payload, self.parser)
+            parsed = self._rows_to_horse_data(payload)
+        self._set_odds(parsed)
+
+    def _set_odds(self, horse_data):
+        """Replace latest_odds and publish what changed onto the events queue.
+
+        ``horse_data`` is keyed by runner name; latest_odds is keyed by runner id.
+        """
+        if self.closed:
+            return
+        horse_data = self.runners.assign("sportsbet", horse_data)
+        if self.events is not None:
+            for change in diff_odds(self.race_key, "sportsbet", self.latest_odds, horse_data):
+                self.events.put_nowait(change)
+        self.latest_odds = horse_data
+
+    async def close(self):
+        """Stop this race for good: wait out any in-flight refresh, then release the page.
+
+        Retired races are closed rather than cleaned up, so a refresh that was already
+        running can't publish odds or reopen a page after the race is gone.
+        """
+        self.closed = True
+        await self._idle.wait()
+        await self.cleanup()
 
     async def cleanup(self):
         """Cleanup resources."""
         if self.page:
             try:
-                await self.page.close()
+                # Sharded contexts pool pages instead of closing them
+                release_page = getattr(self.context, "release_page", None)
+                if release_page:
+                    await release_page(self.page)
+                else:
+                    await self.page.close()
                 self.page = None
             except:
                 pass
@@ -37,24 +127,18 @@ class SportsbetRace:
             await self.initialize()
             html = await self.page.content()
 
-            soup = BeautifulSoup(html, "html.parser")
+            title, race_time = parse_race_header(html, self.parser)
+            race_time = race_time or "Unknown Time" # this dosen't work - not tested at all
 
-            race_title = soup.find("h1", class_=lambda x: x and "title" in x.lower())
-            race_name = race_title.text.strip() if race_title else "Unknown Race"
+            # Venue, region and race number come from the URL slug, as they do for listings
+            slug = parse_race_url(self.url) or {}
+            location = slug.get("location", "Unknown Location")
+            race_name = slug.get("race_name") or title or "Unknown Race"
 
-            time_element = soup.select_one(
-                "span.size14_f7opyze.defaultTimer_f17adqu9, span.size16_f6irgbz"
-            )
-            race_time = time_element.text.strip() if time_element else "Unknown Time" # this dosen't work - not tested at all
-
-            # Update location extraction to handle both types
-            location_match = re.search(r"/(horse|greyhound)-racing/([^/]+)", self.url)
-            location = location_match.group(2).replace("-", " ").title() if location_match else "Unknown Location"
-
-            race_number_match = re.search(r"Race (\d+)", race_name)
-            if not race_number_match:
-                race_number_match = re.search(r"race-(\d+)-", self.url)
-            race_number = race_number_match.group(1) if race_number_match else "Unknown"
+            race_number = slug.get("race_number")
+            if not race_number:
+                race_number_match = re.search(r"Race (\d+)", title or "")
+                race_number = race_number_match.group(1) if race_number_match else "Unknown"
 
             race_type = "greyhound" if "greyhound-racing" in self.url else "horse"
 
@@ -82,88 +166,55 @@ class SportsbetRace:
                 "url": self.url
             }
 
-    async def stream_odds(self, interval=5):
+    async def _refresh_from_page(self):
+        """Read the outcome cards out of the live page without reloading it."""
+        rows = await self.page.evaluate(EXTRACT_ROWS_JS)
+        if not rows:
+            raise RuntimeError("No outcome cards found in page")
+        self.ingest("rows", rows)
+
+    async def _refresh_from_reload(self):
+        """Reload the page and re-parse the outcome cards from its HTML."""
+        # Reload the page content
+        await self.page.reload()
+        await self.page.wait_for_selector(".outcomeCard_f7jc198", timeout=10000)
+
+        # Extract page source and parse only the outcome cards
+        content = await self.page.content()
+        parsed = None
+        if self.parse_pool:
+            parsed = await self.parse_pool.parse(self, "sportsbet", content, self.parser.name)
+            if parsed is None:
+                return  # dropped as stale; the next refresh brings a newer page
+        self.ingest("html", content, parsed)
+
+    async def refresh(self):
+        """Fetch one update of the odds, reinitializing the page if it fails."""
+        if self.closed:
+            return
+        self._idle.clear()
         try:
             await self.initialize()
-            
-            while True:
-                try:
-                    # Reload the page content
-                    await self.page.reload()
-                    await self.page.wait_for_selector(".outcomeCard_f7jc198", timeout=10000)
-
-                    # Extract page source for parsing
-                    content = await self.page.content()
-                    soup = BeautifulSoup(content, "html.parser")
-
-                    horse_data = {}
-
-                    # Loop through each outcome card and extract odds
-                    for outcome in soup.find_all("div", class_="outcomeCard_f7jc198"):
-                        try:
-                            name_tag = outcome.find("div", class_="outcomeName_f18x6kvm")
-                            if not name_tag:
-                                continue
-                            
-                            name_parts = name_tag.text.strip().split(". ")
-                            number = name_parts[0] if len(name_parts) > 1 else ""
-                            name = name_parts[1] if len(name_parts) > 1 else name_parts[0]
-                            
-                            # Extract odds information
-                            odds_tags = outcome.find_all("span", class_="priceFlucsTextDesktop_fiml4cj")
-                            open_odds = odds_tags[0].text.strip() if len(odds_tags) > 0 else "N/A"
-                            fluc1_odds = odds_tags[1].text.strip() if len(odds_tags) > 1 else "N/A"
-                            fluc2_odds = odds_tags[2].text.strip() if len(odds_tags) > 2 else "N/A"
-                            price_buttons = outcome.find_all("div", class_="priceText_f71sibe")
-                            win_fixed = price_buttons[0].text.strip() if len(price_buttons) > 0 else "N/A"
-
-                            # Clean the name - remove apostrophes, special characters and extra spaces
-                            horse_name = name.strip().replace('\xa0', '')
-                            horse_name = re.sub(r'\s*\(\d+\)', '', horse_name)
-                            # Store original name for display
-                            display_name = horse_name.replace("'", "").replace("'", "").replace(".", "").strip()
-                            # Create lowercase version for dictionary key
-                            dict_key = display_name.lower()
-
-                            # Store odds in horse_data
-                            horse_data[dict_key] = {
-                                "display_name": display_name,
-                                "number": number.strip(),
-                                "3rd_back": None,
-                                "2nd_back": None,
-                                "1st_back": float(win_fixed) if win_fixed != "N/A" else None,
-                                "1st_lay": None,
-                                "2nd_lay": None,
-                                "3rd_lay": None,
-                                "3rd_back_dom": None,
-                                "2nd_back_dom": None,
-                                "1st_back_dom": None,
-                                "1st_lay_dom": None,
-                                "2nd_lay_dom": None, 
-                                "3rd_lay_dom": None,
-                                "fluctuations": {
-                                    "open": open_odds,
-                                    "open_decimal": float(open_odds) if open_odds != "N/A" else None,
-                                    "fluctuation1": fluc1_odds,
-                                    "fluctuation2": fluc2_odds,
-                                }
-                            }
-
-                        except Exception as e:
-                            self.logger.error(f"Error processing outcome: {e}")
-                            continue
-
-                    self.latest_odds = horse_data
-
-                except Exception as e:
-                    self.logger.error(f"Error in stream_odds loop: {e}")
-                    # Try to reinitialize the page if there was an error
-                    await self.cleanup()
-                    await self.initialize()
-
-                await asyncio.sleep(interval)
+            if self.mode == "evaluate":
+                # With push enabled this is only a safety net for missed mutations
+                await self._refresh_from_page()
+            else:
+                await self._refresh_from_reload()
 
         except Exception as e:
-            self.logger.error(f"Fatal error in stream_odds: {e}")
+            self.logger.error(f"Error refreshing odds: {e}")
+            # Try to reinitialize the page if there was an error
             await self.cleanup()
-            raise
\ No newline at end of file
+            if not self.closed:
+                await self.initialize()
+        finally:
+            self._idle.set()
+
+    async def stream_odds(self, interval=5):
+        """Poll this race on its own at a fixed interval.
+
+        The coordinator drives many races through a shared PollScheduler instead.
+        """
+        scheduler = PollScheduler(tiers=(), far_interval=interval)
+        scheduler.add(self)
+        await scheduler.run()
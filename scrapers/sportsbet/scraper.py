@@ -1,5 +1,7 @@
 from utils.logger import setup_logger
+from utils.concurrency import iter_sliding_window, sliding_window
 from .race import SportsbetRace
+from .listing import LISTING_ANCHORS_JS, SITE_URL, extract_event_id, is_race_href, parse_listing_entry
 from bs4 import BeautifulSoup
 import asyncio
 
@@ -10,6 +12,11 @@ class SportsbetScraper:
         self.logger = setup_logger("SportsbetScraper")
 
     async def get_race_urls(self, tommorow=False):
+        return [entry["url"] for entry in await self.get_race_listings(tommorow)]
+
+    async def get_race_listings(self, tommorow=False):
+        """Return {"url", "metadata"} for every race on the schedule page; metadata is
+        None if the link couldn't be parsed."""
         url = f"{self.base_url}/tomorrow" if tommorow else self.base_url
         self.logger.info(f"Navigating to {url}")
         
@@ -17,44 +24,60 @@ class SportsbetScraper:
         await page.goto(url, timeout=60000)
 
         await page.wait_for_selector("a.link_fqiekv4", timeout=10000)
-        anchors = await page.query_selector_all("a")
+        anchors = await page.eval_on_selector_all("a", LISTING_ANCHORS_JS)
 
         race_links = []
-        for a in anchors:
-            href = await a.get_attribute("href")
-            if href and ("horse-racing/" in href or "greyhound-racing/" in href) and "race-" in href:
-                race_links.append(f"https://www.sportsbet.com.au{href}")
+        for href, text in anchors:
+            if is_race_href(href):
+                race_links.append({"url": f"{SITE_URL}{href}", "metadata": parse_listing_entry(href, text)})
 
         await page.close()
         self.logger.info(f"Found {len(race_links)} races.")
         return race_links
 
+    async def get_race_metadata(self, tommorow=False):
+        """Metadata for every listed race, opening race pages only for links that couldn't be parsed."""
+        return [metadata async for metadata in self.iter_race_metadata(tommorow)]
+
+    async def iter_race_metadata(self, tommorow=False):
+        """Yield race metadata as soon as each record is available.
+
+        Races parsed from the schedule come out first, then race-page fallbacks in the
+        order they finish.
+        """
+        listings = await self.get_race_listings(tommorow)
+        fallback_urls = []
+        for entry in listings:
+            if entry["metadata"]:
+                yield entry["metadata"]
+            else:
+                fallback_urls.append(entry["url"])
+        self.logger.info(f"Parsed {len(listings) - len(fallback_urls)} races from the schedule, {len(fallback_urls)} need their race page")
+
+        async for metadata in self.iter_race_metadata_batch(fallback_urls):
+            yield metadata
+
+    def extract_event_id(self, url):
+        return extract_event_id(url)
+
     async def get_race_objects(self, urls):
         return [SportsbetRace(url, self.context) for url in urls]
 
-    async def get_race_metadata_batch(self, urls, batch_size=10):
-        self.logger.info("Starting batch processing of Sportsbet race metadata")
+    async def _fetch_metadata(self, race):
+        try:
+            return await race.fetch_metadata()
+        finally:
+            # Free the page as soon as this race is done, not when its batch is
+            if race.page:
+                await race.cleanup()
+
+    async def iter_race_metadata_batch(self, urls, concurrency=10):
+        """Like get_race_metadata_batch, but yields each race as soon as its page is read."""
         races = await self.get_race_objects(urls)
-        results = []
-        
-        for i in range(0, len(races), batch_size):
-            batch = races[i:i + batch_size]
-            self.logger.info(f"Processing races {i+1} to {i+len(batch)}")
-            
-            try:
-                # Gather metadata for all races in batch
-                infos = await asyncio.gather(*(race.fetch_metadata() for race in batch))
-                results.extend(infos)
-            except Exception as e:
-                self.logger.error(f"Error processing batch {i+1} to {i+len(batch)}: {e}")
-                raise
-            finally:
-                # Ensure cleanup happens for each race in the batch
-                cleanup_tasks = []
-                for race in batch:
-                    if race.page:  # Only cleanup if page exists
-                        cleanup_tasks.append(race.cleanup())
-                if cleanup_tasks:
-                    await asyncio.gather(*cleanup_tasks, return_exceptions=True)
-                
-        return results
\ No newline at end of file
+        async for metadata in iter_sliding_window(races, self._fetch_metadata, limit=concurrency):
+            yield metadata
+
+    async def get_race_metadata_batch(self, urls, concurrency=10):
+        self.logger.info(f"Fetching Sportsbet race metadata for {len(urls)} races, {concurrency} at a time")
+        races = await self.get_race_objects(urls)
+        return await sliding_window(races, self._fetch_metadata, limit=concurrency)
@@ -1,35 +1,56 @@
 import sys
-from PyQt6 import QtWidgets
+from PyQt6 import QtWidgets, QtCore
 from qasync import QEventLoop, asyncSlot
 from ui.odds_graph import OddsGraph
 from data.odds_store import shared_odds
+from data.price_history import price_history
+from data.pricing import pricing_engine
+from utils.coordinator_process import CoordinatorProcess
 from utils.logger import setup_logger
 import asyncio
 
 logger = setup_logger("UI")
 
+# How often the GUI drains the coordinator process's odds channel
+CHANNEL_POLL_MS = 50
+
 async def initialize_races(graph, matched_races_coro):
     # Load matched races (already sorted by time in load_matched_races)
     matched_races = await matched_races_coro(tommorow=False)
-    # Take the first 5 upcoming races
-    matched_races = matched_races[:5]
     logger.info(f"Initializing UI with {len(matched_races)} races")
     # Update GUI with matched races
     graph.update_matched_races(matched_races)
 
-def launch_ui(coordinator, matched_races):
+def launch_ui(coordinator, matched_races, separate_process=False):
+    """Show the GUI and start the coordinator.
+
+    With ``separate_process`` the coordinator runs in its own process and streams
+    odds back over a shared-memory channel, so scraping never stalls repainting.
+    Otherwise it shares the GUI's event loop.
+    """
     app = QtWidgets.QApplication(sys.argv)
     loop = QEventLoop(app)
     asyncio.set_event_loop(loop)
 
     graph = OddsGraph()
     graph.show()
+    # Redraw once a second, touching only races that changed since the last frame
+    graph.run_updater(shared_odds)
 
     # Initialize races
     loop.create_task(initialize_races(graph, matched_races))
     
-    # Start the coordinator
-    loop.create_task(coordinator())
+    # Start the coordinator; races it discovers are added to the views as they match
+    if separate_process:
+        process = CoordinatorProcess(coordinator)
+        process.start()
+        channel_timer = QtCore.QTimer(app)
+        channel_timer.timeout.connect(
+            lambda: process.poll(shared_odds, (price_history, pricing_engine), on_match=graph.add_matched_race))
+        channel_timer.start(CHANNEL_POLL_MS)
+        app.aboutToQuit.connect(process.stop)
+    else:
+        loop.create_task(coordinator(on_match=graph.add_matched_race))
 
     with loop:
-        loop.run_forever()
\ No newline at end of file
+        loop.run_forever()
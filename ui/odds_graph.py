@@ -2,7 +2,13 @@ from PyQt6 import QtWidgets, QtCore, QtGui
 import pyqtgraph as pg
 from pyqtgraph import PlotWidget, BarGraphItem
 import numpy as np
-from data.odds_store import shared_odds
+from data.odds_store import shared_odds, make_odds_key
+from data.price_history import price_history
+from data.runners import runner_name
+from data.runner_odds import price
+from data.pricing import betfair_commission_rate, betfair_payout, pricing_engine
+from data.staking import BF_BACK_STAKE, BF_LAY_STAKE, SB_STAKE, stake_allocator
+from data.liquidity import liquidity_engine
 
 # Define color scheme
 COLORS = {
@@ -49,11 +55,8 @@ class MarketDepthWidget(QtWidgets.QFrame):
         horse_names = []  # For x-axis labels
         
         for idx, horse in enumerate(horses):
-            # Get display name from data
-            display_name = horses_data[horse].get("display_name", horse)
-            data = horses_data[horse]
-            betfair_data = data.get('betfair', {})
-            volume = parse_volume(betfair_data.get('1st_back_dom', 0))
+            display_name = runner_name(horses_data[horse])
+            volume = price(horses_data[horse], 'betfair', '1st_back_dom', 0)
             
             # Always add the horse to maintain same order as odds graph
             x.append(idx)
@@ -81,17 +84,6 @@ class MarketDepthWidget(QtWidgets.QFrame):
         self.depth_plot.setTitle("Market Depth by Runner", color=COLORS['text'])
         self.depth_plot.setLabel('left', 'Volume ($)', color=COLORS['text'])
 
-def parse_volume(vol_str):
-    """Parse volume string to float, handling currency symbols"""
-    if not vol_str:
-        return 0
-    # Remove currency symbols and commas
-    clean_str = str(vol_str).replace('$', '').replace(',', '')
-    try:
-        return float(clean_str)
-    except (ValueError, TypeError):
-        return 0
-
 class PriceHistoryWidget(QtWidgets.QFrame):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -104,10 +96,27 @@ class PriceHistoryWidget(QtWidgets.QFrame):
         layout.addWidget(header)
         
         # Price chart
-        self.price_plot = pg.PlotWidget(background=COLORS['background'])
+        self.price_plot = pg.PlotWidget(background=COLORS['background'], axisItems={'bottom': pg.DateAxisItem()})
         self.price_plot.showGrid(x=True, y=True, alpha=0.3)
+        self.price_plot.setLabel('left', 'Odds', color=COLORS['text'])
+        self.price_plot.addLegend(labelTextColor=COLORS['text'])
         layout.addWidget(self.price_plot)
 
+    def update_history(self, history, race_key, runner, display_name=None, max_points=500):
+        """Plot one runner's Betfair back/lay and Sportsbet win history."""
+        self.price_plot.clear()
+        if runner is None:
+            return
+        self.price_plot.setTitle(f"Price History: {display_name or runner}", color=COLORS['text'])
+        for series, name, color in (
+            ("bf_back", "Betfair Back", COLORS['accent2']),
+            ("bf_lay", "Betfair Lay", COLORS['error']),
+            ("sb_win", "Sportsbet", COLORS['accent1']),
+        ):
+            ts, values = history.series(race_key, runner, series, max_points=max_points)
+            if len(ts):
+                self.price_plot.plot(ts, values, pen=pg.mkPen(color=color, width=2), name=name)
+
 class RaceDashboardCard(QtWidgets.QFrame):
     def __init__(self, race_info, race_index, parent=None):
         super().__init__(parent)
@@ -213,12 +222,8 @@ class BetfairComparisonWidget(QtWidgets.QFrame):
         capped_indicators = []  # To store which bars are capped
         
         for idx, horse in enumerate(horses):
-            # Clean horse name
-            horse = horse.replace("'", "")
-            data = horses_data[horse].get('betfair', {})
-            
-            back = float(data.get('1st_back', 0) or 0)
-            lay = float(data.get('1st_lay', 0) or 0)
+            back = price(horses_data[horse], 'betfair', '1st_back', 0)
+            lay = price(horses_data[horse], 'betfair', '1st_lay', 0)
             
             # Cap the displayed values at 100
             back_display = min(back, 100)
@@ -227,7 +232,7 @@ class BetfairComparisonWidget(QtWidgets.QFrame):
             x.append(idx)
             back_odds.append(back_display)
             lay_odds.append(lay_display)
-            horse_names.append(horse)
+            horse_names.append(runner_name(horses_data[horse]))
             capped_indicators.append((back > 100, lay > 100))
         
         if not x:  # No valid data
@@ -282,20 +287,12 @@ class OddsGraph(QtWidgets.QMainWindow):
         
         # Store matched races
         self.matched_races = []
+        self.race_keys = []      # odds store key per matched race, computed once
+        self.race_indices = {}   # odds store key -> index into matched_races
         self.current_race_index = 0
-        
-        # Helper functions
-        def parse_volume(vol_str):
-            """Parse volume string to float, handling currency symbols"""
-            if not vol_str:
-                return 0
-            # Remove currency symbols and commas
-            clean_str = str(vol_str).replace('$', '').replace(',', '')
-            try:
-                return float(clean_str)
-            except (ValueError, TypeError):
-                return 0
-        self.parse_volume = parse_volume
+        self._drawn_version = 0  # odds store version the last frame was drawn from
+        self.selected_runner = None
+        self.table_runners = []
 
         # Create main widget and layout
         main_widget = QtWidgets.QWidget()
@@ -446,9 +443,9 @@ class OddsGraph(QtWidgets.QMainWindow):
         
         # Enhanced table with order book
         self.table = QtWidgets.QTableWidget()
-        self.table.setColumnCount(6)
+        self.table.setColumnCount(7)
         self.table.setHorizontalHeaderLabels([
-            "Runner", "Betfair Back", "Betfair Lay", "Market Depth", "Betfair Payout", "Sportsbet Odds"
+            "Runner", "Betfair Back", "Betfair Lay", "Market Depth", "Betfair Payout", "Sportsbet Odds", "Stake"
         ])
         self.table.horizontalHeader().setStretchLastSection(False)
         header = self.table.horizontalHeader()
@@ -490,10 +487,27 @@ class OddsGraph(QtWidgets.QMainWindow):
             }}
         """)
         stats_layout = QtWidgets.QVBoxLayout(stats_group)
+        bankroll_row = QtWidgets.QHBoxLayout()
+        bankroll_label = QtWidgets.QLabel("Bankroll:")
+        bankroll_label.setStyleSheet(f"color: {COLORS['text']}; font-size: 14px;")
+        self.bankroll_input = QtWidgets.QDoubleSpinBox()
+        self.bankroll_input.setRange(0, 1_000_000)
+        self.bankroll_input.setDecimals(2)
+        self.bankroll_input.setPrefix("$")
+        self.bankroll_input.setValue(stake_allocator.bankroll)
+        self.bankroll_input.valueChanged.connect(self.on_bankroll_changed)
+        bankroll_row.addWidget(bankroll_label)
+        bankroll_row.addWidget(self.bankroll_input)
+        bankroll_row.addStretch()
+        stats_layout.addLayout(bankroll_row)
         self.summary_label = QtWidgets.QLabel()
         self.summary_label.setStyleSheet(f"color: {COLORS['text']}; font-size: 14px;")
         stats_layout.addWidget(self.summary_label)
         right_layout.addWidget(stats_group)
+
+        # Price history for the selected runner
+        self.price_history_widget = PriceHistoryWidget()
+        right_layout.addWidget(self.price_history_widget)
         
         splitter.addWidget(right_pane)
         detail_layout.addWidget(splitter)
@@ -560,7 +574,12 @@ class OddsGraph(QtWidgets.QMainWindow):
 
     def update_matched_races(self, races):
         """Update the list of matched races and populate both views."""
-        self.matched_races = races
+        self.matched_races = list(races)
+        self.race_keys = [make_odds_key(race) for race in races]
+        self.race_indices = {race_key: idx for idx, race_key in enumerate(self.race_keys)}
+        for race_key, race in zip(self.race_keys, self.matched_races):
+            pricing_engine.set_race_type(race_key, race['betfair']['race_type'])
+        self._drawn_version = 0
         self.race_selector.clear()
         
         # Clear existing race cards
@@ -572,88 +591,79 @@ class OddsGraph(QtWidgets.QMainWindow):
         
         # Create race cards for dashboard
         for idx, race in enumerate(races):
-            race_info = race['betfair']
-            card = RaceDashboardCard(race_info, idx, self)
-            card.view_button.clicked.connect(lambda checked, idx=idx: self.show_race_details(idx))
-            row = idx // 2  # 2 cards per row
-            col = idx % 2
-            self.race_grid.addWidget(card, row, col)
-            
-            # Add to race selector and race list
-            race_text = f"{race_info['location']} - Race {race_info['race_number']} - {race_info['race_time']}"
-            self.race_selector.addItem(race_text, idx)
-            
-            # Add to race list
-            item = QtWidgets.QListWidgetItem(race_text)
-            item.setData(QtCore.Qt.ItemDataRole.UserRole, idx)
-            self.race_list.addItem(item)
+            self._add_race_widgets(idx, race)
+
+    def add_matched_race(self, race):
+        """Append one newly matched race, leaving the races already shown alone."""
+        race_key = make_odds_key(race)
+        if race_key in self.race_indices:
+            # Already shown; keep its details (e.g. jump time) current
+            self.matched_races[self.race_indices[race_key]] = race
+            return
+        pricing_engine.set_race_type(race_key, race['betfair']['race_type'])
+        idx = len(self.matched_races)
+        self.matched_races.append(race)
+        self.race_keys.append(race_key)
+        self.race_indices[race_key] = idx
+        self._add_race_widgets(idx, race)
+
+    def _add_race_widgets(self, idx, race):
+        race_info = race['betfair']
+        card = RaceDashboardCard(race_info, idx, self)
+        card.view_button.clicked.connect(lambda checked, idx=idx: self.show_race_details(idx))
+        row = idx // 2  # 2 cards per row
+        col = idx % 2
+        self.race_grid.addWidget(card, row, col)
+
+        # Add to race selector and race list
+        race_text = f"{race_info['location']} - Race {race_info['race_number']} - {race_info['race_time']}"
+        self.race_selector.addItem(race_text, idx)
+
+        # Add to race list
+        item = QtWidgets.QListWidgetItem(race_text)
+        item.setData(QtCore.Qt.ItemDataRole.UserRole, idx)
+        self.race_list.addItem(item)
 
     def show_race_details(self, race_index):
         """Show detailed view for the selected race."""
         self.current_race_index = race_index
         self.race_selector.setCurrentIndex(race_index)
         self.show_detail_view()
-        self.update_odds(shared_odds)  # Refresh the display
+        self.update_odds(shared_odds, redraw_detail=True)  # Refresh the display
 
     def get_betfair_commission_rate(self, race_type):
         """Return the Betfair commission rate based on race type."""
-        return 0.08 if race_type == "greyhound" else 0.10  # 8% for greyhounds, 10% for horses
+        return betfair_commission_rate(race_type)
 
     def calculate_betfair_payout(self, odds, race_type):
         """Calculate actual payout for Betfair odds after commission."""
-        if not odds or odds <= 0:
-            return 0
-        commission_rate = self.get_betfair_commission_rate(race_type)
-        # The payout formula is: (odds - 1) * (1 - commission_rate) + 1
-        return (odds - 1) * (1 - commission_rate) + 1
-
-    def update_dashboard(self, odds_store):
-        """Update the dashboard cards with latest odds information."""
-        if not odds_store or 'races' not in odds_store:
-            return
-            
-        race_odds = odds_store['races']
-        for idx, race in enumerate(self.matched_races):
+        return betfair_payout(odds, race_type)
+
+    def update_dashboard(self, snapshot, race_indices=None):
+        """Update the dashboard cards with latest odds information.
+
+        Only the cards at ``race_indices`` are redrawn (all of them if None).
+        """
+        race_odds = snapshot.races
+        if race_indices is None:
+            race_indices = range(len(self.matched_races))
+        for idx in race_indices:
+            race = self.matched_races[idx]
             card = self.race_grid.itemAt(idx).widget()
             if not card:
                 continue
                 
-            race_key = f"{race['betfair']['location']}_R{race['betfair']['race_number']}"
+            race_key = self.race_keys[idx]
             if race_key not in race_odds:
                 continue
                 
-            race_data = race_odds[race_key]
             race_type = race['betfair']['race_type']
             
-            # Calculate probabilities and best EV
-            horses = sorted(race_data.keys())
-            total_sb_prob = 0
-            total_bf_prob = 0
-            best_ev = 0  # Sum of minimum probabilities
-            
-            for horse in horses:
-                # Get display name from data
-                display_name = race_data[horse].get("display_name", horse)
-                
-                sb_odds = float(race_data[horse].get("sportsbet", {}).get("1st_back", 0) or 0)
-                bf_odds = float(race_data[horse].get("betfair", {}).get("1st_back", 0) or 0)
-                
-                if sb_odds and bf_odds:
-                    sb_prob = 1 / sb_odds if sb_odds > 0 else 0
-                    # Calculate Betfair probability with commission
-                    bf_payout = self.calculate_betfair_payout(bf_odds, race_type)
-                    bf_prob = 1 / bf_payout if bf_payout > 0 else 0
-                    
-                    total_sb_prob += sb_prob
-                    total_bf_prob += bf_prob
-                    
-                    # Take the lower probability (higher odds) for each horse
-                    best_ev += min(sb_prob, bf_prob)
-
-            # Calculate alternative EV based on sum of probabilities ratio
-            alt_ev_sb = 1 / total_sb_prob if total_sb_prob > 0 else 0
-            alt_ev_bf = 1 / total_bf_prob if total_bf_prob > 0 else 0
-            alt_ev = max(alt_ev_sb, alt_ev_bf)  # Take the better EV between the two bookmakers
+            # Probabilities and EVs come precomputed for every race by the pricing engine
+            summary = pricing_engine.summary(race_key)
+            if summary is None:
+                continue
+            total_sb_prob, total_bf_prob, best_ev, alt_ev = summary
             
             # Update card content
             card.probabilities.setText(
@@ -686,26 +696,35 @@ class OddsGraph(QtWidgets.QMainWindow):
             # Show detail view
             self.show_detail_view()
 
-    def update_odds(self, odds_store):
-        """Update both dashboard and detail view with current odds."""
-        self.update_dashboard(odds_store)
-        
-        if not odds_store or 'races' not in odds_store:
-            return
+    def on_bankroll_changed(self, value):
+        stake_allocator.bankroll = value
+        self.update_odds(shared_odds, redraw_detail=True)
+
+    def update_odds(self, odds_store, redraw_detail=False):
+        """Update both dashboard and detail view for races changed since the last frame."""
+        snapshot = odds_store.snapshot()
+        version, changed = odds_store.changed_since(self._drawn_version)
+        self._drawn_version = version
+        changed = set(changed)
+
+        self.update_dashboard(snapshot, [self.race_indices[key] for key in changed if key in self.race_indices])
 
         # Get odds for current race
         if not self.matched_races or self.current_race_index >= len(self.matched_races):
             return
             
         race = self.matched_races[self.current_race_index]
-        race_key = f"{race['betfair']['location']}_R{race['betfair']['race_number']}"
-        race_odds = odds_store['races'].get(race_key, {})
+        race_key = self.race_keys[self.current_race_index]
+        if not redraw_detail and race_key not in changed:
+            return
+        race_odds = snapshot.races.get(race_key, {})
         race_type = race['betfair']['race_type']
         
         if not race_odds:
             return
 
         horses = sorted(race_odds.keys())
+        self.table_runners = horses  # table row -> runner id
 
         # Update market depth with all horses' data
         market_depth = self.findChild(MarketDepthWidget)
@@ -718,9 +737,9 @@ class OddsGraph(QtWidgets.QMainWindow):
         x = []
 
         # Update table headers
-        self.table.setColumnCount(6)
+        self.table.setColumnCount(7)
         self.table.setHorizontalHeaderLabels([
-            "Runner", "Betfair Back", "Betfair Lay", "Market Depth", "Betfair Payout", "Sportsbet Odds"
+            "Runner", "Betfair Back", "Betfair Lay", "Market Depth", "Betfair Payout", "Sportsbet Odds", "Stake"
         ])
 
         # Set all columns to resize to content
@@ -729,18 +748,25 @@ class OddsGraph(QtWidgets.QMainWindow):
             header.setSectionResizeMode(i, QtWidgets.QHeaderView.ResizeMode.ResizeToContents)
 
         self.table.setRowCount(len(horses))
+        payouts = pricing_engine.payouts(race_key)
+        plan = stake_allocator.plan(race_key)
 
         for row, horse in enumerate(horses):
-            # Get display name from data
-            display_name = race_odds[horse].get("display_name", horse)
+            display_name = runner_name(race_odds[horse])
             
-            sb = float(race_odds[horse].get("sportsbet", {}).get("1st_back", 0) or 0)
-            bf_back = float(race_odds[horse].get("betfair", {}).get("1st_back", 0) or 0)
-            bf_lay = float(race_odds[horse].get("betfair", {}).get("1st_lay", 0) or 0)
-            bf_payout = self.calculate_betfair_payout(bf_back, race_type)
+            sb = price(race_odds[horse], "sportsbet", "1st_back", 0)
+            bf_back = price(race_odds[horse], "betfair", "1st_back", 0)
+            bf_lay = price(race_odds[horse], "betfair", "1st_lay", 0)
+            bf_payout = float(payouts[horse]) if horse < len(payouts) else 0
             
             # Get volume from DOM
-            volume = self.parse_volume(race_odds[horse].get("betfair", {}).get("1st_back_dom", 0))
+            volume = price(race_odds[horse], "betfair", "1st_back_dom", 0)
+
+            # This runner's bets from the stake plan, if it has any
+            stakes = plan.stakes[horse] if plan and plan.strategy and horse < len(plan.stakes) else ()
+            bets = [f"{label} ${stakes[column]:,.2f}"
+                    for label, column in (("SB", SB_STAKE), ("BF back", BF_BACK_STAKE), ("BF lay", BF_LAY_STAKE))
+                    if len(stakes) and stakes[column] > 0]
             
             sportsbet_odds.append(sb)
             betfair_odds.append(bf_back)
@@ -753,7 +779,8 @@ class OddsGraph(QtWidgets.QMainWindow):
                 QtWidgets.QTableWidgetItem(f"{bf_lay:.2f}"),
                 QtWidgets.QTableWidgetItem(f"${volume:,.2f}"),
                 QtWidgets.QTableWidgetItem(f"{bf_payout:.2f}"),
-                QtWidgets.QTableWidgetItem(f"{sb:.2f}")
+                QtWidgets.QTableWidgetItem(f"{sb:.2f}"),
+                QtWidgets.QTableWidgetItem(" + ".join(bets))
             ]
 
             # Set colors for best odds (comparing actual payouts)
@@ -796,12 +823,11 @@ class OddsGraph(QtWidgets.QMainWindow):
         self.plot_item.addItem(sportsbet_bar)
 
         # Use display names for x-axis labels
-        ticks = [[(i, race_odds[horses[i]].get("display_name", horses[i])) for i in range(len(horses))]]
+        ticks = [[(i, runner_name(race_odds[horses[i]])) for i in range(len(horses))]]
         self.bottom_axis.setTicks(ticks)
 
         # Calculate totals and EV
-        sb_total_prob = sum(1/odds if odds > 0 else 0 for odds in sportsbet_odds)
-        bf_total_prob = sum(1/payout if payout > 0 else 0 for payout in betfair_payouts)
+        sb_total_prob, bf_total_prob = pricing_engine.book_totals(race_key)
         
         # Calculate EV based on sum of probabilities ratio
         alt_ev_sb = 1 / sb_total_prob if sb_total_prob > 0 else 0
@@ -826,10 +852,19 @@ class OddsGraph(QtWidgets.QMainWindow):
         # Join the probability summaries
         prob_summary = " | ".join(summary_parts)
         
-        # Add betting strategy explanation if profitable
-        strategy = ""
-        if alt_ev >= 1:
-            strategy = f"\n\nBetting Strategy: Take all highlighted (green) odds\nExpected return: {alt_ev:.3f}"
+        # Add the stake plan for the current bankroll
+        if plan and plan.strategy:
+            name = "Dutch every runner" if plan.strategy == "dutch" else "Back on Sportsbet, lay on Betfair"
+            strategy = (f"\n\nBetting Strategy: {name} (see Stake column)\n"
+                        f"Outlay: ${plan.outlay:,.2f} | Guaranteed profit: ${plan.profit:,.2f}")
+            execution = liquidity_engine.execution(race_key)
+            if execution:
+                strategy += (f"\nExecutable on the Betfair ladder: {execution.fill_ratio*100:.0f}% "
+                             f"(outlay ${execution.outlay:,.2f}, profit ${execution.profit:,.2f})")
+            else:
+                strategy += "\nExecutable on the Betfair ladder: not enough depth"
+        else:
+            strategy = "\n\nBetting Strategy: no guaranteed profit at the current prices and bankroll"
             
         # Set the complete text
         self.summary_label.setText(f"{prob_summary}\n\n{ev_label.text()}{strategy}")
@@ -839,16 +874,25 @@ class OddsGraph(QtWidgets.QMainWindow):
         if betfair_comparison:
             betfair_comparison.update_comparison(race_odds)
 
+        # Update price history for the selected runner (the first runner until one is picked)
+        runner = self.selected_runner if self.selected_runner in race_odds else horses[0]
+        self.price_history_widget.update_history(price_history, race_key, runner, runner_name(race_odds[runner]))
+
     def update_selected_runner_depth(self, race_odds):
         """Update market depth display for the selected runner"""
         selected_items = self.table.selectedItems()
         if not selected_items:
             return
             
-        # Get the runner name from the first column of the selected row
-        display_name = self.table.item(selected_items[0].row(), 0).text()
-        # Convert to lowercase for dictionary lookup
-        runner_key = display_name.lower()
+        row = selected_items[0].row()
+        if row >= len(self.table_runners):
+            return
+        runner_key = self.table_runners[row]
+        display_name = self.table.item(row, 0).text()
+        self.selected_runner = runner_key
+        self.price_history_widget.update_history(
+            price_history, self.race_keys[self.current_race_index], runner_key, display_name
+        )
         
         # Update market depth with all race data
         market_depth = self.findChild(MarketDepthWidget)
@@ -0,0 +1,65 @@
+import asyncio
+
+
+async def sliding_window(items, worker, limit=10):
+    """Run ``worker(item)`` for every item with at most ``limit`` in flight.
+
+    Unlike fixed batches, a new item starts as soon as any running one finishes,
+    so one slow page never holds up the rest. Results come back in input order.
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(item):
+        async with semaphore:
+            return await worker(item)
+
+    return await asyncio.gather(*(run(item) for item in items))
+
+
+async def iter_sliding_window(items, worker, limit=10):
+    """Like sliding_window, but yields each result as soon as it is ready (completion order)."""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(item):
+        async with semaphore:
+            return await worker(item)
+
+    tasks = [asyncio.create_task(run(item)) for item in items]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def merge_streams(streams, logger=None):
+    """Interleave named async generators, yielding (name, item) in arrival order.
+
+    A stream that fails is logged and dropped; the others keep going.
+    """
+    queue = asyncio.Queue()
+    finished = object()
+
+    async def pump(name, stream):
+        try:
+            async for item in stream:
+                await queue.put((name, item))
+        except Exception as e:
+            if logger:
+                logger.error(f"Stream {name} failed: {e}")
+        finally:
+            await queue.put((name, finished))
+
+    tasks = [asyncio.create_task(pump(name, stream)) for name, stream in streams.items()]
+    remaining = len(tasks)
+    try:
+        while remaining:
+            name, item = await queue.get()
+            if item is finished:
+                remaining -= 1
+                continue
+            yield name, item
+    finally:
+        for task in tasks:
+            task.cancel()
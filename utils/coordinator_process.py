@@ -0,0 +1,147 @@
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor
+from data.odds_channel import DEFAULT_CAPACITY, OddsChannelReader, OddsChannelWriter, resync_changes
+from data.odds_store import odds_events, shared_odds
+from utils.logger import setup_logger
+
+logger = setup_logger("CoordinatorProcess")
+
+
+async def _forward(coordinator, writer, resync_interval=0.5, shutdown_timeout=20):
+    """Run the coordinator and stream its merged odds changes into the channel.
+
+    Pipe sends block while the GUI is slow to drain, so every call on ``writer``
+    runs on one channel thread, in order, and never stalls the scraping loop.
+    """
+    loop = asyncio.get_running_loop()
+    channel = ThreadPoolExecutor(max_workers=1, thread_name_prefix="odds-channel")
+    queue = odds_events.subscribe()
+    task = asyncio.create_task(coordinator(on_match=lambda match: channel.submit(writer.send_match, match)))
+    try:
+        while not task.done():
+            try:
+                changes = [await asyncio.wait_for(queue.get(), timeout=resync_interval)]
+                while not queue.empty():
+                    changes.append(queue.get_nowait())
+                await loop.run_in_executor(channel, writer.send_changes, changes)
+            except asyncio.TimeoutError:
+                pass
+            requests = await loop.run_in_executor(channel, writer.poll_requests)
+            if "stop" in requests:
+                logger.info("GUI asked the coordinator to stop")
+                break
+            if "resync" in requests:
+                await loop.run_in_executor(channel, writer.send_snapshot, shared_odds.snapshot().races)
+    except (BrokenPipeError, EOFError):
+        logger.info("GUI closed the odds channel, stopping the coordinator")
+    finally:
+        odds_events.unsubscribe(queue)
+        # Cancelling lets the coordinator's own cleanup run: race pages, the
+        # parse pool, recordings and the browsers are all closed on the way out
+        task.cancel()
+        try:
+            await asyncio.wait_for(task, timeout=shutdown_timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError):
+            pass
+        except Exception as e:
+            logger.error(f"Coordinator failed while stopping: {e}")
+        channel.shutdown(cancel_futures=True)
+
+
+def run_coordinator(coordinator, conn, shm_name, capacity):
+    """Entry point of the scraping process."""
+    writer = OddsChannelWriter(conn, shm_name, capacity)
+    try:
+        asyncio.run(_forward(coordinator, writer))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        writer.close()
+
+
+class CoordinatorProcess:
+    """Runs the scraping coordinator in its own process, feeding this process's odds store.
+
+    Parsing and Playwright round-trips then use the scraping process's cores and
+    event loop, and the GUI only pays for ``poll``: draining the odds channel and
+    applying what arrived to the odds store as one new version.
+
+    The process isn't daemonic, so it can run its own parse workers; ``stop`` asks
+    it to shut down cleanly and only terminates it if it doesn't.
+    """
+
+    def __init__(self, coordinator, capacity=DEFAULT_CAPACITY):
+        self.coordinator = coordinator
+        self.capacity = capacity
+        self.process = None
+        self.reader = None
+
+    def start(self):
+        # Spawn rather than fork: the parent has Qt and an event loop running
+        ctx = multiprocessing.get_context("spawn")
+        parent_conn, child_conn = ctx.Pipe()
+        self.reader = OddsChannelReader(parent_conn, self.capacity)
+        self.process = ctx.Process(target=run_coordinator, name="coordinator",
+                                   args=(self.coordinator, child_conn, self.reader.shm_name, self.capacity))
+        self.process.start()
+        child_conn.close()
+        logger.info(f"Started coordinator process {self.process.pid}")
+
+    def poll(self, store, sinks=(), on_match=None):
+        """Apply everything the coordinator has sent since the last poll.
+
+        Each of ``sinks`` (e.g. the price history) gets the changes through ``record_many``.
+        A resync snapshot replaces the store's races outright.
+        """
+        changes = []
+        for kind, payload in self.reader.poll():
+            if kind == "change":
+                changes.append(payload)
+            elif kind == "snapshot":
+                self._apply(store, sinks, changes)
+                changes = []
+                resync = resync_changes(store.snapshot().races, payload)
+                store.replace(payload)
+                for sink in sinks:
+                    sink.record_many(resync)
+            elif kind == "match" and on_match:
+                on_match(payload)
+        self._apply(store, sinks, changes)
+
+    @staticmethod
+    def _apply(store, sinks, changes):
+        if changes:
+            store.apply(changes)
+            for sink in sinks:
+                sink.record_many(changes)
+
+    def stop(self, timeout=30):
+        """Ask the coordinator to shut down, terminating it if it takes longer than ``timeout``.
+
+        The channel is drained (and what arrives discarded) while waiting, so the
+        coordinator can't stay blocked sending to a full pipe and miss the request.
+        """
+        if self.process is not None:
+            try:
+                self.reader.request_stop()
+            except (BrokenPipeError, OSError):
+                pass  # already gone
+            deadline = time.monotonic() + timeout
+            draining = True
+            while self.process.is_alive() and time.monotonic() < deadline:
+                if draining:
+                    try:
+                        self.reader.poll()
+                    except (EOFError, OSError):
+                        draining = False  # the coordinator closed its end
+                self.process.join(0.1)
+            if self.process.is_alive():
+                logger.warning("Coordinator process didn't stop in time, terminating it")
+                self.process.terminate()
+                self.process.join(5)
+            self.process = None
+        if self.reader is not None:
+            self.reader.close()
+            self.reader = None
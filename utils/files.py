@@ -0,0 +1,27 @@
+import json
+import os
+import tempfile
+
+
+def write_bytes_atomic(path, data):
+    """Write bytes to a temp file next to ``path`` and rename it into place.
+
+    Readers (or a crash mid-write) never see a half-written file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def write_json_atomic(path, data):
+    """Write indented JSON to ``path`` atomically (see write_bytes_atomic)."""
+    write_bytes_atomic(path, json.dumps(data, indent=2).encode("utf-8"))
@@ -1,4 +1,5 @@
 import logging
+import os
 import sys
 from logging.handlers import RotatingFileHandler
 
@@ -19,6 +20,7 @@ def setup_logger(name: str, level=logging.INFO) -> logging.Logger:
     console_handler.setFormatter(console_format)
 
     # File handler with rotation
+    os.makedirs("logs", exist_ok=True)
     file_handler = RotatingFileHandler(
         "logs/scraper.log", maxBytes=2 * 1024 * 1024, backupCount=5
     )
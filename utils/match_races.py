@@ -3,9 +3,13 @@ from scrapers.betfair.scraper import BetfairScraper
 from scrapers.sportsbet.scraper import SportsbetScraper
 from scrapers.betfair.browser import BrowserManager
 from utils.logger import setup_logger
+from utils.concurrency import merge_streams
+from utils.race_matcher import RaceMatcher
+from utils.race_catalog import UNKNOWN_JUMP, get_race_catalog, jump_timestamp
 from datetime import datetime
 import json
 import os
+import time
 
 logger = setup_logger("MatchRaces")
 
@@ -23,10 +27,8 @@ def make_race_key(race):
  
 def is_future_race(race):
     try:
-        time_str = race["betfair"]["race_time"]
-        race_time = datetime.strptime(time_str, "%H:%M").time()
-        now = datetime.now().time()
-        return race_time > now
+        jump = jump_timestamp(race)
+        return jump != UNKNOWN_JUMP and jump > time.time()
     except Exception as e:
         logger.info(f"Error in determining if a race is in the future: {e}")
         return False
@@ -38,26 +40,32 @@ async def get_all_scrapers(context):
         # Add more scrapers here later like: "ladbrokes": LadbrokesScraper(context)
     }
 
+async def fetch_scraper_metadata(scraper):
+    # Read from the schedule pages, opening race pages only for unparseable entries
+    return await scraper.get_race_metadata(tommorow=False)
+
 async def fetch_all_metadata(scrapers):
-    data = {}
-    for name, scraper in scrapers.items():
-        urls = await scraper.get_race_urls(tommorow=False)
-        races = await scraper.get_race_metadata_batch(urls)
-        data[name] = races
-    return data
+    # Every bookmaker is crawled at the same time
+    results = await asyncio.gather(*(fetch_scraper_metadata(scraper) for scraper in scrapers.values()))
+    return dict(zip(scrapers, results))
+
+async def stream_matched_races(scrapers, matcher=None, tommorow=False):
+    """Yield each matched race the moment its last bookmaker reports it."""
+    matcher = matcher or RaceMatcher(scrapers)
+    streams = {name: scraper.iter_race_metadata(tommorow) for name, scraper in scrapers.items()}
+    async for name, race in merge_streams(streams, logger):
+        matched = matcher.add(name, race)
+        if matched:
+            yield matched
 
 async def match_races():
     async with BrowserManager() as context:
         scrapers = await get_all_scrapers(context)
-        race_data = await fetch_all_metadata(scrapers)
-
-        # Build dicts keyed by race_name and race_number
-        race_maps = {
-            name: {make_race_key(race): race for race in races}
-            for name, races in race_data.items()
-        }
+        matcher = RaceMatcher(scrapers)
+        matched_races = [matched async for matched in stream_matched_races(scrapers, matcher)]
 
-        # Get intersection of all race keys
+        # Every scraped race per bookmaker, keyed by race_name and race_number
+        race_maps = matcher.race_maps
         all_keys = list(race_maps.values())
         
         # Write all_keys to debug file
@@ -67,20 +75,10 @@ async def match_races():
                 'race_maps': race_maps,
                 'all_keys_values': all_keys
             }, f, indent=2)
-            
-        common_keys = set(all_keys[0]).intersection(*all_keys[1:])
-
-        logger.info(f"Found {len(common_keys)} matched races across all sources")
-
-        matched_races = []
-        for key in common_keys:
-            matched = {scraper: race_maps[scraper][key] for scraper in race_maps}
-            matched_races.append(matched)
 
+        logger.info(f"Found {len(matched_races)} matched races across all sources")
         return matched_races
 
-MATCHED_RACES_FILE = "matched_races.json"
-
 def is_file_modified_today(path):
     if not os.path.exists(path):
         return False
@@ -89,10 +87,8 @@ def is_file_modified_today(path):
 
 def get_race_datetime(race):
     try:
-        time_str = race["betfair"]["race_time"]
-        race_time = datetime.strptime(time_str, "%H:%M").time()
-        today = datetime.now().date()
-        return datetime.combine(today, race_time)
+        jump = jump_timestamp(race)
+        return datetime.max if jump == UNKNOWN_JUMP else datetime.fromtimestamp(jump)
     except Exception as e:
         logger.info(f"Error getting race datetime: {e}")
         return datetime.max
@@ -102,22 +98,19 @@ def sort_races_by_time(matches):
     return sorted(matches, key=get_race_datetime)
 
 async def load_matched_races(tommorow=False):
-    """Load matched races from cache."""
-    if not os.path.exists(MATCHED_RACES_FILE):
-        logger.error("No race cache found. Please run the race matcher service first.")
+    """Load matched races from the race catalog, which is read from disk once per process."""
+    catalog = get_race_catalog()
+    if not len(catalog):
+        # Not an error: the coordinator's background refresh builds the cache
+        logger.info("No race cache yet, races will be added as they are matched.")
         return []
 
-    with open(MATCHED_RACES_FILE, "r", encoding="utf-8") as f:
-        logger.info("Reading matched races from cache.")
-        all_matches = json.load(f)
-
     if tommorow:
         logger.info("Matched races are being served with tommorow=True")
+        return list(catalog)
 
-    # Filter races that are still upcoming
-    upcoming_matches = [match for match in all_matches if (is_future_race(match) or tommorow)]
-    # Sort races by time
-    return sort_races_by_time(upcoming_matches)
+    # Already sorted by jump time, so the upcoming races are one slice
+    return catalog.upcoming()
 
 # For testing
 if __name__ == "__main__":
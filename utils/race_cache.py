@@ -0,0 +1,122 @@
+import json
+import os
+import time
+from data.odds_store import make_odds_key
+from utils.concurrency import merge_streams
+from utils.files import write_json_atomic
+from utils.logger import setup_logger
+from utils.race_catalog import RACE_CATALOG_FILE, RaceCatalog
+from utils.race_matcher import RaceMatcher
+
+logger = setup_logger("RaceCache")
+
+RACE_CACHE_FILE = "race_cache.json"
+# Bumped whenever the entry keys change meaning; caches of another version are ignored
+CACHE_VERSION = 2
+ENTRY_TTL = 30 * 60      # seconds before a race read from its race page is read again
+REFRESH_INTERVAL = 5 * 60
+
+
+def is_unread(race):
+    """True for the placeholder metadata returned when a race page couldn't be read."""
+    return race.get("location") in ("Unknown", "Unknown Location")
+
+
+class RaceCache:
+    """Incremental matched-races cache, keyed by each bookmaker's event id.
+
+    A refresh only re-reads the listing pages. Races the listing describes are
+    taken straight from it; a race page is opened only for listings that couldn't
+    be parsed and whose cached entry is missing or past its TTL. Races that drop
+    off a listing (abandoned, or already run) are evicted, so late additions and
+    removals show up on the next refresh.
+    """
+
+    def __init__(self, path=RACE_CACHE_FILE, catalog_path=RACE_CATALOG_FILE, ttl=ENTRY_TTL):
+        self.path = path
+        self.catalog_path = catalog_path
+        self.ttl = ttl
+        self.entries = {}     # source -> event id -> {"race": metadata, "expires_at": epoch seconds}
+        self.matched = {}     # odds key -> matched race
+        self.removed = set()  # odds keys the last refresh dropped
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error(f"Ignoring unreadable race cache {self.path}: {e}")
+            return
+        if data.get("version") != CACHE_VERSION:
+            logger.info(f"Ignoring race cache {self.path} from an older version")
+            return
+        self.entries = data.get("entries", {})
+        self.matched = {make_odds_key(match): match for match in data.get("matched", [])}
+
+    def save(self):
+        catalog = RaceCatalog(self.matched.values())
+        write_json_atomic(self.path, {"version": CACHE_VERSION, "updated_at": time.time(),
+                                      "entries": self.entries, "matched": catalog.races})
+        # The catalog load_matched_races reads, with jump times already parsed
+        catalog.save(self.catalog_path)
+
+    async def _iter_source(self, name, scraper, tommorow, fresh, failed):
+        """Yield one bookmaker's races, reusing cached entries that are still fresh."""
+        now = time.time()
+        cached = self.entries.get(name, {})
+        entries = fresh.setdefault(name, {})
+        try:
+            listings = await scraper.get_race_listings(tommorow)
+            to_fetch = []
+            for listing in listings:
+                event_id = scraper.extract_event_id(listing["url"])
+                entry = cached.get(event_id)
+                if listing["metadata"]:
+                    entry = {"race": listing["metadata"], "expires_at": now + self.ttl}
+                elif entry is None or entry["expires_at"] <= now:
+                    to_fetch.append(listing["url"])
+                    continue
+                entries[event_id] = entry
+                yield entry["race"]
+
+            logger.info(f"{name}: {len(listings)} listed, {len(to_fetch)} race pages to read")
+            async for race in scraper.iter_race_metadata_batch(to_fetch):
+                if not is_unread(race):
+                    # Unread pages aren't cached, so they are retried next refresh
+                    entries[scraper.extract_event_id(race["url"])] = {"race": race, "expires_at": time.time() + self.ttl}
+                yield race
+        except Exception as e:
+            logger.error(f"Refreshing {name} failed, keeping its cached races: {e}")
+            failed.add(name)
+
+    async def refresh(self, scrapers, tommorow=False):
+        """Re-read every bookmaker and yield each matched race that is new or changed.
+
+        Once the refresh finishes, ``removed`` holds the odds keys of matched races
+        that are no longer listed, and both cache files have been rewritten.
+        """
+        fresh, failed, matched = {}, set(), {}
+        matcher = RaceMatcher(scrapers)
+        streams = {name: self._iter_source(name, scraper, tommorow, fresh, failed)
+                   for name, scraper in scrapers.items()}
+        async for name, race in merge_streams(streams, logger):
+            match = matcher.add(name, race)
+            if match:
+                key = make_odds_key(match)
+                matched[key] = match
+                if self.matched.get(key) != match:
+                    yield match
+
+        if failed:
+            # A bookmaker we couldn't read says nothing about which races are gone
+            for name in failed:
+                fresh[name] = {**self.entries.get(name, {}), **fresh.get(name, {})}
+            matched = {**self.matched, **matched}
+
+        self.removed = set(self.matched) - set(matched)
+        self.entries, self.matched = fresh, matched
+        self.save()
+        logger.info(f"Race cache holds {len(matched)} matched races ({len(self.removed)} removed)")
@@ -0,0 +1,136 @@
+import bisect
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from data.odds_store import make_odds_key
+from utils.files import write_bytes_atomic
+from utils.logger import setup_logger
+from utils.race_matcher import jump_minute
+
+try:
+    import orjson
+except ImportError:  # the stdlib reads and writes the same file, just slower
+    orjson = None
+
+logger = setup_logger("RaceCatalog")
+
+RACE_CATALOG_FILE = "race_catalog.json"
+UNKNOWN_JUMP = float("inf")  # races with no usable jump time sort last and never count as past
+
+
+def jump_timestamp(race, day=None):
+    """Epoch seconds of a matched race's Betfair jump time on ``day`` (today by default)."""
+    minute = jump_minute(race["betfair"].get("race_time"))
+    if minute is None:
+        return UNKNOWN_JUMP
+    day = day or datetime.now().date()
+    return (datetime.combine(day, datetime.min.time()) + timedelta(minutes=minute)).timestamp()
+
+
+def _dumps(data):
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def _loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class RaceCatalog:
+    """Every matched race for the day, sorted by jump time and loaded once.
+
+    Jump times are parsed once into epoch seconds and kept as a sorted index next
+    to the races, so finding the upcoming races or a race's jump time is a bisect
+    or a dict lookup rather than a ``strptime`` per race. The file is compact JSON
+    bytes (orjson when installed) holding the races and their jump times.
+    """
+
+    def __init__(self, races=(), jump_times=None, day=None):
+        self.day = day or datetime.now().date()
+        races = list(races)
+        if jump_times is None:
+            jump_times = [jump_timestamp(race, self.day) for race in races]
+        order = sorted(range(len(races)), key=jump_times.__getitem__)
+        self.races = [races[i] for i in order]
+        self.jump_times = [jump_times[i] for i in order]
+        self._by_key = {make_odds_key(race): i for i, race in enumerate(self.races)}
+
+    def __len__(self):
+        return len(self.races)
+
+    def __iter__(self):
+        return iter(self.races)
+
+    def __contains__(self, race_key):
+        return race_key in self._by_key
+
+    def get(self, race_key):
+        i = self._by_key.get(race_key)
+        return self.races[i] if i is not None else None
+
+    def jump_time(self, race_key):
+        """Epoch seconds of a race's jump, UNKNOWN_JUMP if it has none or isn't listed."""
+        i = self._by_key.get(race_key)
+        return self.jump_times[i] if i is not None else UNKNOWN_JUMP
+
+    def upcoming(self, now=None):
+        """Races with a known jump time that haven't jumped yet, earliest first."""
+        start = bisect.bisect_right(self.jump_times, time.time() if now is None else now)
+        end = bisect.bisect_left(self.jump_times, UNKNOWN_JUMP)
+        return self.races[start:end]
+
+    def between(self, start, end):
+        """Races jumping in [start, end) epoch seconds, earliest first."""
+        lo = bisect.bisect_left(self.jump_times, start)
+        hi = bisect.bisect_left(self.jump_times, end)
+        return self.races[lo:hi]
+
+    def save(self, path=RACE_CATALOG_FILE):
+        """Write the catalog atomically, replacing any previous one."""
+        # inf isn't valid JSON, so unknown jump times are stored as null
+        jump_times = [None if t == UNKNOWN_JUMP else t for t in self.jump_times]
+        data = _dumps({"day": self.day.isoformat(), "races": self.races, "jump_times": jump_times})
+        write_bytes_atomic(path, data)
+
+    @classmethod
+    def load(cls, path=RACE_CATALOG_FILE):
+        """Read a saved catalog, or return an empty one if there is none yet."""
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return cls()
+        with open(path, "rb") as f:
+            data = _loads(f.read())
+
+        day = datetime.fromisoformat(data["day"]).date()
+        if day != datetime.now().date():
+            # Saved jump times are for another day, so re-anchor them to today
+            return cls(data["races"])
+        jump_times = [UNKNOWN_JUMP if t is None else t for t in data["jump_times"]]
+        return cls(data["races"], jump_times, day)
+
+
+_catalogs = {}  # path -> (file version, RaceCatalog)
+
+
+def _file_version(path):
+    # Saves replace the file, so a rewrite changes the inode even within one mtime tick
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def get_race_catalog(path=RACE_CATALOG_FILE):
+    """The process-wide catalog, read again only when the file has been rewritten."""
+    version = _file_version(path)
+    cached = _catalogs.get(path)
+    if cached is None or cached[0] != version:
+        catalog = RaceCatalog.load(path)
+        _catalogs[path] = (version, catalog)
+        logger.info(f"Loaded {len(catalog)} races from {path}")
+        return catalog
+    return cached[1]
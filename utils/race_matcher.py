@@ -0,0 +1,227 @@
+import json
+import os
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from utils.files import write_json_atomic
+
+VENUE_ALIASES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "venue_aliases.json")
+LEARNED_ALIASES_FILE = "venue_aliases_learned.json"  # runtime cache, kept out of the source tree
+
+TIME_WINDOW = 5          # minutes either side of the jump time a candidate may be
+MIN_VENUE_SCORE = 0.85   # venue similarity needed to accept a match
+MIN_LEARN_SCORE = 0.95   # ...and to remember a fuzzy venue match as an alias
+
+
+def normalize_venue(name):
+    """Lowercase a venue and drop everything but letters and digits ("Sha Tin" -> "shatin")."""
+    return re.sub(r"[^a-z0-9]", "", str(name or "").lower())
+
+
+def jump_minute(race_time):
+    """Minutes after midnight for "HH:MM", or None for unknown times ("0", "Unknown Time")."""
+    match = re.fullmatch(r"(\d{1,2}):(\d{2})", str(race_time or "").strip())
+    if not match:
+        return None
+    return int(match.group(1)) * 60 + int(match.group(2))
+
+
+def race_number(value):
+    """The race number as an int, or None where a site has none (UK races are -1/0)."""
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return None
+    return number if number > 0 else None
+
+
+def trigrams(venue):
+    """Character trigrams of a normalized venue (the whole name if it is shorter)."""
+    if len(venue) < 3:
+        return {venue}
+    return {venue[i:i + 3] for i in range(len(venue) - 2)}
+
+
+class VenueAliases:
+    """Alias -> canonical venue table (both sides normalized).
+
+    Seeded from the tracked ``venue_aliases.json``, which is never written at
+    runtime. Venues that matched fuzzily but closely (at least ``learn_score``) are
+    learned into a separate cache at ``learned_path``, so the next run matches them
+    exactly; looser matches still pair races but are never remembered.
+    """
+
+    def __init__(self, path=VENUE_ALIASES_FILE, learned_path=LEARNED_ALIASES_FILE, persist=True,
+                 learn_score=MIN_LEARN_SCORE):
+        self.learned_path = learned_path
+        self.persist = persist  # False keeps learned aliases in memory only
+        self.learn_score = learn_score
+        self.aliases = self._load(path)
+        self.learned = self._load(learned_path)
+        self.aliases.update(self.learned)
+
+    @staticmethod
+    def _load(path):
+        if path and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {}
+
+    def canonical(self, venue):
+        return self.aliases.get(venue, venue)
+
+    def learn(self, alias, canonical, score):
+        """Remember ``alias`` for ``canonical`` if their match scored at least ``learn_score``."""
+        if score < self.learn_score or alias == canonical or self.aliases.get(alias) == canonical:
+            return
+        self.aliases[alias] = self.learned[alias] = canonical
+        if self.learned_path and self.persist:
+            write_json_atomic(self.learned_path, dict(sorted(self.learned.items())))
+
+    def similarity(self, a, b):
+        a, b = self.canonical(a), self.canonical(b)
+        if a == b:
+            return 1.0
+        if min(len(a), len(b)) >= 4 and (a in b or b in a):
+            # "yarmouth" / "yarmouthdogs"
+            return 0.9
+        return SequenceMatcher(None, a, b).ratio()
+
+
+class _Entry:
+    __slots__ = ("source", "race", "race_type", "venue", "minute", "number", "links")
+
+    def __init__(self, source, race):
+        self.source = source
+        self.race = race
+        self.race_type = race.get("race_type")
+        self.venue = normalize_venue(race.get("race_name"))
+        self.minute = jump_minute(race.get("race_time"))
+        self.number = race_number(race.get("race_number"))
+        self.links = {}  # source -> _Entry it is matched with
+
+
+class RaceMatcher:
+    """Matches the same race across bookmakers without relying on exact keys.
+
+    Candidates are blocked by (race_type, jump time +-``window`` minutes), falling
+    back to (race_type, race number) when a site doesn't show a time. Within a
+    block, race numbers must agree when both sides have one, and the venue must
+    score at least ``min_score`` against the alias table. Only venues sharing a
+    trigram are scored, and each score is computed once per venue pair, so
+    matching stays roughly linear in the number of races.
+
+    Races are matched against the first source (the anchor) as they are added;
+    ``add`` returns the matched race once every source has a partner.
+    """
+
+    def __init__(self, sources, aliases=None, window=TIME_WINDOW, min_score=MIN_VENUE_SCORE):
+        self.sources = tuple(sources)
+        self.anchor = self.sources[0]
+        self.aliases = aliases if aliases is not None else VenueAliases()
+        self.window = window
+        self.min_score = min_score
+        self.race_maps = {source: {} for source in self.sources}  # as-scraped races, for debugging
+        # source -> block key -> venue -> entries
+        self._by_time = {source: defaultdict(lambda: defaultdict(list)) for source in self.sources}
+        self._by_number = {source: defaultdict(lambda: defaultdict(list)) for source in self.sources}
+        # source -> (race_type, trigram) -> venues, so only look-alike venues are scored
+        self._grams = {source: defaultdict(set) for source in self.sources}
+        self._scores = {}
+        self._seen = {source: set() for source in self.sources}
+
+    def _index(self, entry):
+        source = entry.source
+        if entry.minute is not None:
+            self._by_time[source][(entry.race_type, entry.minute // self.window)][entry.venue].append(entry)
+        if entry.number is not None:
+            self._by_number[source][(entry.race_type, entry.number)][entry.venue].append(entry)
+        for gram in trigrams(self.aliases.canonical(entry.venue)):
+            self._grams[source][(entry.race_type, gram)].add(entry.venue)
+
+    def _similar_venues(self, entry, source):
+        """Venues from ``source`` scoring at least ``min_score`` against ``entry``'s venue."""
+        venues = set()
+        for gram in trigrams(self.aliases.canonical(entry.venue)):
+            venues.update(self._grams[source].get((entry.race_type, gram), ()))
+        similar = {}
+        for venue in venues:
+            pair = (entry.venue, venue)
+            score = self._scores.get(pair)
+            if score is None:
+                score = self._scores[pair] = self.aliases.similarity(*pair)
+            if score >= self.min_score:
+                similar[venue] = score
+        return similar
+
+    def _candidates(self, entry, source):
+        """(score, race) for unmatched look-alike races from ``source`` in ``entry``'s blocks."""
+        similar = self._similar_venues(entry, source)
+        if not similar:
+            return
+        blocks = []
+        if entry.minute is not None:
+            bucket = entry.minute // self.window
+            blocks.extend(self._by_time[source].get((entry.race_type, b)) for b in (bucket - 1, bucket, bucket + 1))
+        if entry.number is not None:
+            blocks.append(self._by_number[source].get((entry.race_type, entry.number)))
+        for block in blocks:
+            if not block:
+                continue
+            for venue, score in similar.items():
+                for candidate in block.get(venue, ()):
+                    yield score, candidate
+
+    def _compatible(self, a, b):
+        if a.number is not None and b.number is not None and a.number != b.number:
+            return False
+        if a.minute is not None and b.minute is not None:
+            return abs(a.minute - b.minute) <= self.window
+        # No time on one side, so the race number has to carry the match
+        return a.number is not None and b.number is not None
+
+    def _best(self, entry, source, link_source):
+        """The best unmatched candidate from ``source`` and its venue score, or (None, 0)."""
+        best, best_key = None, None
+        for score, candidate in self._candidates(entry, source):
+            if link_source in candidate.links or not self._compatible(entry, candidate):
+                continue
+            gap = abs(entry.minute - candidate.minute) if entry.minute is not None and candidate.minute is not None else 0
+            key = (score, -gap)
+            if best_key is None or key > best_key:
+                best, best_key = candidate, key
+        return best, best_key[0] if best_key else 0
+
+    def _link(self, anchor, other, score):
+        anchor.links[other.source] = other
+        other.links[self.anchor] = anchor
+        if self.aliases.canonical(anchor.venue) != self.aliases.canonical(other.venue):
+            self.aliases.learn(other.venue, self.aliases.canonical(anchor.venue), score)
+
+    def add(self, source, race):
+        race_key = f"{race.get('race_type')}_{normalize_venue(race.get('race_name'))}_{race.get('race_number')}"
+        identity = race.get("url") or race_key
+        if identity in self._seen[source]:
+            return None
+        self._seen[source].add(identity)
+        self.race_maps[source][race_key] = race
+
+        entry = _Entry(source, race)
+        self._index(entry)
+        if source == self.anchor:
+            for other in self.sources[1:]:
+                candidate, score = self._best(entry, other, self.anchor)
+                if candidate:
+                    self._link(entry, candidate, score)
+            anchor = entry
+        else:
+            anchor, score = self._best(entry, self.anchor, source)
+            if anchor is None:
+                return None
+            self._link(anchor, entry, score)
+
+        if len(anchor.links) < len(self.sources) - 1:
+            return None
+        matched = {self.anchor: anchor.race}
+        matched.update((name, linked.race) for name, linked in anchor.links.items())
+        return {name: matched[name] for name in self.sources}